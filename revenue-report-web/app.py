@@ -255,6 +255,50 @@ def show_main_app():
             show_send_email_tab()
 
 
+# ========== Report Files ==========
+@st.cache_data(show_spinner=False)
+def _scan_report_files(reports_path: str, dir_mtime_ns: int) -> list:
+    """
+    สแกนไฟล์ Excel ใน reports directory
+    (cache ตาม mtime ของ directory - สแกนใหม่เมื่อมีการเพิ่ม/ลบ/เปลี่ยนชื่อไฟล์เท่านั้น)
+
+    Args:
+        reports_path: path ของ reports directory
+        dir_mtime_ns: mtime ของ directory (ใช้เป็น cache key)
+
+    Returns:
+        list: [(file_name, size_bytes, mtime), ...] เรียงตามชื่อไฟล์ล่าสุดก่อน
+    """
+    report_files = []
+    # os.scandir ได้ชื่อไฟล์และ stat มาพร้อมกันจาก directory entry (ไม่ต้อง stat แยกทีละไฟล์)
+    with os.scandir(reports_path) as entries:
+        for entry in entries:
+            if entry.name.endswith('.xlsx') and entry.is_file():
+                file_stat = entry.stat()
+                report_files.append((entry.name, file_stat.st_size, file_stat.st_mtime))
+
+    # เรียงตามชื่อไฟล์ (มีวันที่อยู่ในชื่อ) แทนเวลาสร้าง
+    report_files.sort(key=lambda x: x[0], reverse=True)
+    return report_files
+
+
+def list_report_files(reports_path: str) -> list:
+    """
+    ดึงรายการไฟล์ Excel ใน reports directory (ใช้ os.stat ของ directory ครั้งเดียวเมื่อ cache ยังใช้ได้)
+
+    Args:
+        reports_path: path ของ reports directory
+
+    Returns:
+        list: [(file_name, size_bytes, mtime), ...]
+    """
+    try:
+        dir_mtime_ns = os.stat(reports_path).st_mtime_ns
+    except OSError:
+        return []
+    return _scan_report_files(reports_path, dir_mtime_ns)
+
+
 # ========== Browse Reports Tab ==========
 def show_browse_reports_tab():
     """แสดง tab Browse Reports"""
@@ -268,6 +312,7 @@ def show_browse_reports_tab():
         st.info(f"📂 Reports Location: `{reports_path}`")
     with col2:
         if st.button("🔄 Refresh", key="refresh_reports", help="Refresh file list"):
+            _scan_report_files.clear()
             st.rerun()
 
     # Check if path exists
@@ -277,9 +322,7 @@ def show_browse_reports_tab():
         return
 
     # List Excel files
-    excel_files = list(Path(reports_path).glob("*.xlsx"))
-    # เรียงตามชื่อไฟล์ (มีวันที่อยู่ในชื่อ) แทนเวลาสร้าง
-    excel_files.sort(key=lambda x: x.name, reverse=True)
+    excel_files = list_report_files(reports_path)
 
     if not excel_files:
         st.warning("⚠️ ไม่พบไฟล์ Excel ใน directory นี้")
@@ -290,7 +333,8 @@ def show_browse_reports_tab():
     # File selection
     selected_files = []
 
-    for file_path in excel_files:
+    for file_name, file_size, file_mtime in excel_files:
+        file_path = Path(reports_path) / file_name
         col1, col2, col3, col4 = st.columns([3, 2, 2, 1])
 
         with col1:
@@ -298,11 +342,11 @@ def show_browse_reports_tab():
                 selected_files.append(str(file_path))
 
         with col2:
-            size_mb = file_path.stat().st_size / (1024 * 1024)
+            size_mb = file_size / (1024 * 1024)
             st.caption(f"📦 {size_mb:.2f} MB")
 
         with col3:
-            modified_time = datetime.fromtimestamp(file_path.stat().st_mtime)
+            modified_time = datetime.fromtimestamp(file_mtime)
             st.caption(f"🕐 {modified_time.strftime('%Y-%m-%d %H:%M')}")
 
         with col4:
@@ -357,15 +401,14 @@ def show_send_email_tab():
         st.info(f"📂 Reports Location: `{reports_path}`")
     with col2:
         if st.button("🔄 Refresh", key="refresh_email_files", help="Refresh file list"):
+            _scan_report_files.clear()
             st.rerun()
 
     if not Path(reports_path).exists():
         st.error(f"❌ ไม่พบ directory: {reports_path}")
         return
 
-    excel_files = list(Path(reports_path).glob("*.xlsx"))
-    # เรียงตามชื่อไฟล์ (มีวันที่อยู่ในชื่อ) แทนเวลาสร้าง
-    excel_files.sort(key=lambda x: x.name, reverse=True)
+    excel_files = list_report_files(reports_path)
 
     if not excel_files:
         st.warning("⚠️ ไม่พบไฟล์ Excel")
@@ -374,7 +417,8 @@ def show_send_email_tab():
     st.success(f"✓ พบ {len(excel_files)} ไฟล์")
 
     selected_files = []
-    for file_path in excel_files:
+    for file_name, file_size, file_mtime in excel_files:
+        file_path = Path(reports_path) / file_name
         col1, col2, col3 = st.columns([3, 2, 2])
 
         with col1:
@@ -382,11 +426,11 @@ def show_send_email_tab():
                 selected_files.append(str(file_path))
 
         with col2:
-            size_mb = file_path.stat().st_size / (1024 * 1024)
+            size_mb = file_size / (1024 * 1024)
             st.caption(f"📦 {size_mb:.2f} MB")
 
         with col3:
-            modified_time = datetime.fromtimestamp(file_path.stat().st_mtime)
+            modified_time = datetime.fromtimestamp(file_mtime)
             st.caption(f"🕐 {modified_time.strftime('%Y-%m-%d %H:%M')}")
 
     if not selected_files:
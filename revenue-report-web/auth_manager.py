@@ -56,23 +56,13 @@ class AuthManager:
             print(f"Error saving OTPs: {e}")
             return False
 
-    def _cleanup_expired_otps(self):
-        """ลบ OTPs ที่หมดอายุและใช้แล้ว"""
-        data = self._load_otps()
-        otps = data.get('otps', [])
-
-        # Filter out expired and used OTPs
-        now = datetime.now()
-        active_otps = []
-
-        for otp in otps:
-            expires_at = datetime.fromisoformat(otp['expires_at'])
-            # เก็บเฉพาะ OTPs ที่ยังไม่หมดอายุและยังไม่ได้ใช้
-            if expires_at > now and not otp.get('used', False):
-                active_otps.append(otp)
-
-        data['otps'] = active_otps
-        self._save_otps(data)
+    @staticmethod
+    def _active_otps(otps: list, now: datetime) -> list:
+        """กรองเฉพาะ OTPs ที่ยังไม่หมดอายุและยังไม่ได้ใช้ (ตัด OTPs ที่หมดอายุและใช้แล้วทิ้ง)"""
+        return [
+            otp for otp in otps
+            if not otp.get('used', False) and datetime.fromisoformat(otp['expires_at']) > now
+        ]
 
     def generate_otp(self, email: str) -> Tuple[str, datetime]:
         """
@@ -95,22 +85,20 @@ class AuthManager:
         if not user.get('is_active', False):
             raise ValueError(f"User is not active: {email}")
 
-        # Cleanup old OTPs
-        self._cleanup_expired_otps()
-
         # สร้าง OTP code
         otp_config = self.config.get_otp_config()
         code_length = otp_config['code_length']
         expiry_minutes = otp_config['expiry_minutes']
 
-        otp_code = ''.join([str(secrets.randbelow(10)) for _ in range(code_length)])
+        otp_code = f"{secrets.randbelow(10 ** code_length):0{code_length}d}"
 
         # คำนวณเวลาหมดอายุ
         created_at = datetime.now()
         expires_at = created_at + timedelta(minutes=expiry_minutes)
 
-        # บันทึก OTP
+        # บันทึก OTP (cleanup OTPs เก่าใน read/write รอบเดียวกัน)
         data = self._load_otps()
+        data['otps'] = self._active_otps(data.get('otps', []), created_at)
         otp_entry = {
             "email": email.lower(),
             "otp_code": otp_code,
@@ -134,32 +122,28 @@ class AuthManager:
         Returns:
             bool: True ถ้า OTP ถูกต้อง
         """
-        self._cleanup_expired_otps()
-
         data = self._load_otps()
-        otps = data.get('otps', [])
-
         now = datetime.now()
+        email = email.lower()
 
-        for i, otp in enumerate(otps):
-            if (otp['email'].lower() == email.lower() and
-                otp['otp_code'] == otp_code and
-                not otp.get('used', False)):
-
-                # ตรวจสอบว่าหมดอายุหรือไม่
-                expires_at = datetime.fromisoformat(otp['expires_at'])
-                if expires_at > now:
-                    # Mark as used
-                    otps[i]['used'] = True
-                    data['otps'] = otps
-                    self._save_otps(data)
+        # Cleanup + ค้นหา + ใช้ OTP ใน pass เดียว แล้วบันทึกครั้งเดียว
+        # OTP ที่ใช้แล้วถูกตัดออกทันที (เหมือน mark used แล้ว cleanup)
+        verified = False
+        active_otps = []
+        for otp in self._active_otps(data.get('otps', []), now):
+            if not verified and otp['email'].lower() == email and otp['otp_code'] == otp_code:
+                verified = True
+                continue
+            active_otps.append(otp)
 
-                    # Update last login
-                    self.user_manager.update_last_login(email)
+        data['otps'] = active_otps
+        self._save_otps(data)
 
-                    return True
+        if verified:
+            # Update last login
+            self.user_manager.update_last_login(email)
 
-        return False
+        return verified
 
     def is_valid_email_domain(self, email: str) -> bool:
         """
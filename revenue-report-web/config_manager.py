@@ -7,6 +7,7 @@ Config Manager Module
 
 import json
 import os
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Dict, Any, Optional
 from dotenv import load_dotenv
@@ -15,6 +16,23 @@ from dotenv import load_dotenv
 load_dotenv()
 
 
+@dataclass(frozen=True)
+class SMTPConfig:
+    """SMTP configuration (snapshot จาก config.json + .env)"""
+    server: str
+    port: int
+    username: str
+    password: str
+    use_ssl: bool
+    from_email: str
+    sender_name: str
+
+    @property
+    def is_complete(self) -> bool:
+        """ตรวจสอบว่ามี server/username/password ครบหรือไม่"""
+        return all([self.server, self.username, self.password])
+
+
 class ConfigManager:
     """จัดการ configuration files"""
 
@@ -26,6 +44,7 @@ class ConfigManager:
             config_file: ชื่อไฟล์ config (default: config.json)
         """
         self.config_file = config_file
+        self._smtp_config: Optional[SMTPConfig] = None
         self.config = self.load_config()
 
     def load_config(self) -> Dict[str, Any]:
@@ -93,6 +112,7 @@ class ConfigManager:
 
             # Reload config
             self.config = self.load_config()
+            self._smtp_config = None
 
             return True
         except Exception as e:
@@ -143,6 +163,7 @@ class ConfigManager:
 
             # Set the value
             config[keys[-1]] = value
+            self._smtp_config = None
 
             return True
         except Exception as e:
@@ -178,17 +199,22 @@ class ConfigManager:
         """ดึงรายชื่อ admin emails"""
         return self.get('admin_emails', [])
 
-    def get_smtp_config(self) -> Dict[str, Any]:
-        """ดึง SMTP configuration"""
-        return {
-            'server': self.get('email.smtp_server', ''),
-            'port': self.get('email.smtp_port', 465),
-            'username': self.get('email.smtp_username', ''),
-            'password': self.get('email.smtp_password', ''),
-            'use_ssl': self.get('email.use_ssl', True),
-            'from_email': self.get('email.from_email', ''),
-            'sender_name': self.get('email.sender_name', '')
-        }
+    def get_smtp_config(self) -> SMTPConfig:
+        """
+        ดึง SMTP configuration
+        (สร้างครั้งเดียวและใช้ซ้ำจนกว่า config จะถูกแก้ไขหรือ reload)
+        """
+        if self._smtp_config is None:
+            self._smtp_config = SMTPConfig(
+                server=self.get('email.smtp_server', ''),
+                port=int(self.get('email.smtp_port', 465)),
+                username=self.get('email.smtp_username', ''),
+                password=self.get('email.smtp_password', ''),
+                use_ssl=self.get('email.use_ssl', True),
+                from_email=self.get('email.from_email', ''),
+                sender_name=self.get('email.sender_name', '')
+            )
+        return self._smtp_config
 
     def get_otp_config(self) -> Dict[str, Any]:
         """ดึง OTP configuration"""
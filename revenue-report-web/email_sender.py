@@ -6,6 +6,7 @@ Email Sender Module
 """
 
 import smtplib
+import ssl
 import json
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
@@ -16,6 +17,14 @@ from typing import List, Dict, Any, Optional
 
 from config_manager import get_config_manager
 
+try:
+    import orjson  # optional: parse/serialize email_logs.json ได้เร็วกว่า json มาตรฐาน
+except ImportError:
+    orjson = None
+
+# SSL context สร้างครั้งเดียวตอน import (โหลด CA bundle ครั้งเดียว) และใช้ร่วมกันทุกการส่ง
+_SSL_CONTEXT = ssl.create_default_context()
+
 
 class EmailSender:
     """จัดการส่ง email พร้อม attachments"""
@@ -39,6 +48,9 @@ class EmailSender:
     def _load_logs(self) -> Dict[str, list]:
         """โหลด email logs จากไฟล์"""
         try:
+            if orjson is not None:
+                with open(self.log_file, 'rb') as f:
+                    return orjson.loads(f.read())
             with open(self.log_file, 'r', encoding='utf-8') as f:
                 return json.load(f)
         except (FileNotFoundError, json.JSONDecodeError):
@@ -47,6 +59,10 @@ class EmailSender:
     def _save_logs(self, data: Dict[str, list]) -> bool:
         """บันทึก email logs ลงไฟล์"""
         try:
+            if orjson is not None:
+                with open(self.log_file, 'wb') as f:
+                    f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+                return True
             with open(self.log_file, 'w', encoding='utf-8') as f:
                 json.dump(data, f, indent=2, ensure_ascii=False)
             return True
@@ -183,7 +199,7 @@ class EmailSender:
         smtp_config = self.config.get_smtp_config()
 
         # Validate SMTP configuration
-        if not all([smtp_config['server'], smtp_config['username'], smtp_config['password']]):
+        if not smtp_config.is_complete:
             error_msg = "SMTP configuration incomplete (missing server/username/password)"
             self._log_email(to_emails, subject, attachments, "failed", error_msg)
             return {
@@ -195,7 +211,7 @@ class EmailSender:
         # สร้าง email message
         try:
             msg = MIMEMultipart()
-            msg['From'] = f"{smtp_config['sender_name']} <{smtp_config['from_email']}>"
+            msg['From'] = f"{smtp_config.sender_name} <{smtp_config.from_email}>"
             msg['To'] = ", ".join(to_emails)
             msg['Subject'] = subject
 
@@ -244,8 +260,9 @@ class EmailSender:
                 }
 
             # Production Mode: ส่ง email จริง
-            with smtplib.SMTP_SSL(smtp_config['server'], smtp_config['port']) as server:
-                server.login(smtp_config['username'], smtp_config['password'])
+            with smtplib.SMTP_SSL(smtp_config.server, smtp_config.port,
+                                  context=_SSL_CONTEXT) as server:
+                server.login(smtp_config.username, smtp_config.password)
                 server.send_message(msg)
 
             self._log_email(to_emails, subject, attached_files, "sent")
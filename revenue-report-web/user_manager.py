@@ -23,6 +23,10 @@ class UserManager:
             users_file: path ของไฟล์ users.json
         """
         self.users_file = users_file
+        self._users: List[Dict[str, Any]] = []
+        self._users_by_email: Dict[str, Dict[str, Any]] = {}
+        self._users_by_id: Dict[str, Dict[str, Any]] = {}
+        self._index_mtime_ns: Optional[int] = None
         self._ensure_file_exists()
 
     def _ensure_file_exists(self):
@@ -45,11 +49,44 @@ class UserManager:
         try:
             with open(self.users_file, 'w', encoding='utf-8') as f:
                 json.dump(data, f, indent=2, ensure_ascii=False)
+            # บังคับสร้าง email index ใหม่ (mtime อาจไม่เปลี่ยนถ้าเขียนถี่ภายใน timestamp resolution เดียวกัน)
+            self._index_mtime_ns = None
             return True
         except Exception as e:
             print(f"Error saving users: {e}")
             return False
 
+    def _refresh_index(self) -> None:
+        """
+        โหลดรายชื่อผู้ใช้และสร้าง index ตาม email (lowercase) และ ID
+        โหลดใหม่เฉพาะเมื่อไฟล์ users.json เปลี่ยน (ตรวจจาก mtime)
+        """
+        try:
+            mtime_ns = Path(self.users_file).stat().st_mtime_ns
+        except OSError:
+            mtime_ns = None
+
+        if mtime_ns is None or mtime_ns != self._index_mtime_ns:
+            users = self._load_users().get('users', [])
+            self._users = users
+            # ถ้ามี email/ID ซ้ำ ให้ผู้ใช้คนแรกในไฟล์เป็นผู้ชนะ (เหมือนการไล่หาทีละคนแบบเดิม)
+            self._users_by_email = {}
+            self._users_by_id = {}
+            for user in users:
+                self._users_by_email.setdefault(user['email'].lower(), user)
+                self._users_by_id.setdefault(user['id'], user)
+            self._index_mtime_ns = mtime_ns
+
+    def _get_email_index(self) -> Dict[str, Dict[str, Any]]:
+        """ดึง index ของผู้ใช้ตาม email (lowercase)"""
+        self._refresh_index()
+        return self._users_by_email
+
+    def _get_id_index(self) -> Dict[str, Dict[str, Any]]:
+        """ดึง index ของผู้ใช้ตาม ID"""
+        self._refresh_index()
+        return self._users_by_id
+
     def get_all_users(self) -> List[Dict[str, Any]]:
         """
         ดึงรายชื่อผู้ใช้ทั้งหมด
@@ -57,8 +94,9 @@ class UserManager:
         Returns:
             List[Dict]: รายชื่อผู้ใช้
         """
-        data = self._load_users()
-        return data.get('users', [])
+        self._refresh_index()
+        # คืนสำเนาของแต่ละ dict ผู้ใช้ ผู้เรียกแก้ไขได้โดยไม่กระทบ cache
+        return [dict(user) for user in self._users]
 
     def get_user_by_email(self, email: str) -> Optional[Dict[str, Any]]:
         """
@@ -70,11 +108,9 @@ class UserManager:
         Returns:
             Dict หรือ None ถ้าไม่พบ
         """
-        users = self.get_all_users()
-        for user in users:
-            if user['email'].lower() == email.lower():
-                return user
-        return None
+        user = self._get_email_index().get(email.lower())
+        # คืนสำเนา (เช่น app.py เก็บลง st.session_state) ไม่ให้การแก้ไขย้อนไปถึง cache
+        return dict(user) if user is not None else None
 
     def get_user_by_id(self, user_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -86,11 +122,21 @@ class UserManager:
         Returns:
             Dict หรือ None ถ้าไม่พบ
         """
-        users = self.get_all_users()
-        for user in users:
-            if user['id'] == user_id:
-                return user
-        return None
+        user = self._get_id_index().get(user_id)
+        return dict(user) if user is not None else None
+
+    @staticmethod
+    def _new_user_record(email: str, name: str, is_admin: bool = False) -> Dict[str, Any]:
+        """สร้าง dict ข้อมูลผู้ใช้ใหม่ (ยังไม่บันทึกลงไฟล์)"""
+        return {
+            "id": str(uuid.uuid4())[:8],  # Short UUID
+            "email": email.lower(),
+            "name": name,
+            "is_admin": is_admin,
+            "is_active": True,
+            "created_at": datetime.now().isoformat(),
+            "last_login": None
+        }
 
     def create_user(self, email: str, name: str, is_admin: bool = False) -> Dict[str, Any]:
         """
@@ -112,15 +158,7 @@ class UserManager:
             raise ValueError(f"User with email {email} already exists")
 
         # สร้างผู้ใช้ใหม่
-        new_user = {
-            "id": str(uuid.uuid4())[:8],  # Short UUID
-            "email": email.lower(),
-            "name": name,
-            "is_admin": is_admin,
-            "is_active": True,
-            "created_at": datetime.now().isoformat(),
-            "last_login": None
-        }
+        new_user = self._new_user_record(email, name, is_admin)
 
         # เพิ่มลงในไฟล์
         data = self._load_users()
@@ -189,12 +227,14 @@ class UserManager:
         Returns:
             bool: True ถ้าสำเร็จ
         """
-        user = self.get_user_by_email(email)
-        if user:
-            return self.update_user(
-                user['id'],
-                last_login=datetime.now().isoformat()
-            )
+        data = self._load_users()
+        users = data['users']
+
+        for user in users:
+            if user['email'].lower() == email.lower():
+                user['last_login'] = datetime.now().isoformat()
+                return self._save_users(data)
+
         return False
 
     def is_admin(self, email: str) -> bool:
@@ -277,22 +317,33 @@ class UserManager:
         try:
             import csv
 
+            # โหลด users ครั้งเดียว แล้วบันทึกครั้งเดียวหลัง import ครบทุกแถว
+            data = self._load_users()
+            existing_emails = {user['email'].lower() for user in data['users']}
+
             count = 0
             with open(input_file, 'r', encoding='utf-8') as f:
                 reader = csv.DictReader(f)
                 for row in reader:
                     try:
+                        email = row['email'].lower()
                         # ตรวจสอบว่ามี email อยู่แล้วหรือไม่
-                        if not self.get_user_by_email(row['email']):
-                            self.create_user(
-                                email=row['email'],
-                                name=row['name'],
-                                is_admin=row.get('is_admin', 'false').lower() == 'true'
-                            )
-                            count += 1
-                    except (ValueError, KeyError):
+                        if email in existing_emails:
+                            continue
+
+                        data['users'].append(self._new_user_record(
+                            email=email,
+                            name=row['name'],
+                            is_admin=row.get('is_admin', 'false').lower() == 'true'
+                        ))
+                        existing_emails.add(email)
+                        count += 1
+                    except (AttributeError, KeyError):
                         continue
 
+            if count:
+                self._save_users(data)
+
             return count
         except Exception as e:
             print(f"Error importing users: {e}")
@@ -11,14 +11,54 @@ Version: 2.0.0 (Modularized)
 
 import pandas as pd
 import numpy as np
+import xlsxwriter
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, Any, Optional, Tuple
 import os
+import re
+import functools
 import traceback
 from logger_utils import ETLLogger
 
 
+# ตาราง translate สำหรับตัวเลขรูปแบบบัญชี เช่น "(1,234.50)" -> "-1234.50" (ทำใน pass เดียว)
+ACCOUNTING_NUMBER_TABLE = str.maketrans({",": None, "(": "-", ")": None})
+
+@functools.lru_cache(maxsize=16)
+def _read_master_csv_cached(path: str, mtime_ns: int, encoding: Optional[str]) -> pd.DataFrame:
+    """อ่านไฟล์ Master CSV (cache ตาม path + mtime; ไฟล์ถูกแก้ไข = key ใหม่)"""
+    return pd.read_csv(path, encoding=encoding)
+
+
+def read_master_csv(path: str, encoding: Optional[str] = None) -> pd.DataFrame:
+    """
+    อ่านไฟล์ Master CSV โดยใช้ cache ในหน่วยความจำข้ามการรันภายใน process เดียวกัน
+
+    คืนค่าเป็นสำเนา (copy) เสมอ เพราะผู้เรียกมักแก้ไข DataFrame ต่อ (rename/strip/astype)
+    """
+    path = os.path.abspath(path)
+    return _read_master_csv_cached(path, os.stat(path).st_mtime_ns, encoding).copy()
+
+
+# pattern รูปแบบ "^(51|52)" หรือ "^4" = เช็คแค่ prefix ของ GL_CODE
+_GL_PREFIX_PATTERN = re.compile(r"\^\(?(\d+(?:\|\d+)*)\)?")
+
+
+def gl_code_mask(gl_codes: pd.Series, pattern: str) -> pd.Series:
+    """
+    สร้าง boolean mask ของ GL_CODE ตาม pattern ใน config
+
+    ถ้า pattern เป็นแค่ prefix ตัวเลข (เช่น "^(51|53|54|59|52)") จะใช้ str.startswith
+    กับ tuple ของ prefix แทนการรัน regex ทีละแถว; pattern อื่นๆ ยังใช้ str.match ตามเดิม
+    """
+    prefix_match = _GL_PREFIX_PATTERN.fullmatch(pattern)
+    if prefix_match:
+        prefixes = tuple(prefix_match.group(1).split("|"))
+        return gl_codes.str.startswith(prefixes, na=False)
+    return gl_codes.str.match(pattern, na=False)
+
+
 class FIRevenueExpenseProcessor:
     """
     Processor สำหรับประมวลผลข้อมูล Revenue และ Expense จากงบการเงิน
@@ -41,6 +81,15 @@ class FIRevenueExpenseProcessor:
         # ตั้งค่า pandas display
         pd.options.display.float_format = '{:,.2f}'.format
 
+        # Path ของไฟล์ Master (คำนวณครั้งเดียวตอนสร้าง processor)
+        master_files = config['master_files']
+        self.master_paths = {
+            'expense': Path(self.paths['master_source']) / master_files['expense'],
+            'revenue': Path(self.paths['master_source']) / master_files['revenue'],
+            'other_revenue': Path(self.paths['master']) / master_files['other_revenue'],
+            'revenue_expense_net': Path(self.paths['master']) / master_files['revenue_expense_net'],
+        }
+
         # Master DataFrames
         self.master_expense_gl = None
         self.master_revenue_gl = None
@@ -79,13 +128,10 @@ class FIRevenueExpenseProcessor:
             self.log("=" * 80)
             
             # โหลด Master Expense
-            master_expense_file = os.path.join(
-                self.paths['master_source'],
-                self.config['master_files']['expense']
-            )
+            master_expense_file = self.master_paths['expense']
             
             self.log(f"โหลด Master Expense: {self.config['master_files']['expense']}")
-            self.master_expense_gl = pd.read_csv(master_expense_file, encoding="utf8")
+            self.master_expense_gl = read_master_csv(master_expense_file, encoding="utf8")
             self.master_expense_gl = self.master_expense_gl[["CODE_GROUP", "GROUP_NAME", "GL_CODE_NT1", "GL_NAME_NT1"]]
             self.master_expense_gl = self.master_expense_gl.rename(columns={
                 "GL_CODE_NT1": "GL_CODE",
@@ -95,13 +141,10 @@ class FIRevenueExpenseProcessor:
             self.log(f"✓ โหลด Master Expense สำเร็จ: {len(self.master_expense_gl)} GL Codes", "SUCCESS")
             
             # โหลด Master Revenue
-            master_revenue_file = os.path.join(
-                self.paths['master_source'],
-                self.config['master_files']['revenue']
-            )
+            master_revenue_file = self.master_paths['revenue']
             
             self.log(f"โหลด Master Revenue: {self.config['master_files']['revenue']}")
-            self.master_revenue_gl = pd.read_csv(master_revenue_file, encoding="utf8")
+            self.master_revenue_gl = read_master_csv(master_revenue_file, encoding="utf8")
             self.master_revenue_gl = self.master_revenue_gl[["REPORT_CODE", "GL_GROUP", "GL_CODE_NT1", "GL_NAME_NT1"]]
             self.master_revenue_gl = self.master_revenue_gl.rename(columns={
                 "GL_CODE_NT1": "GL_CODE",
@@ -141,11 +184,8 @@ class FIRevenueExpenseProcessor:
             # --- Step 1: สร้างข้อมูล R (รายได้ที่อยู่ใน MASTER_OTHER_REVENUE_NET) ---
             self.logger.info("\n--- Step 1: สร้างข้อมูล R ---")
             
-            master_other_rev_file = os.path.join(
-                self.paths['master'],
-                self.config['master_files']['other_revenue']
-            )
-            master_other_rev = pd.read_csv(master_other_rev_file)
+            master_other_rev_file = self.master_paths['other_revenue']
+            master_other_rev = read_master_csv(master_other_rev_file)
             master_other_rev.columns = master_other_rev.columns.str.strip()
             
             # ทำความสะอาด GL_GROUP
@@ -156,8 +196,23 @@ class FIRevenueExpenseProcessor:
                 
             master_other_rev['GL_CODE'] = master_other_rev['GL_CODE'].astype(str)
             
+            # ใช้ categorical dtype ชุดเดียวกันสำหรับ GL_CODE ทุกตาราง
+            # เพื่อให้ merge และ concat ทำงานบน integer codes แทนการ hash string
+            gl_code_dtype = pd.CategoricalDtype(pd.concat([
+                of_revenue['GL_CODE'],
+                gl_group_expense['GL_CODE'],
+                master_other_rev['GL_CODE']
+            ]).dropna().unique())
+            master_other_rev['GL_CODE'] = master_other_rev['GL_CODE'].astype(gl_code_dtype)
+            master_other_rev['GL_GROUP'] = master_other_rev['GL_GROUP'].astype('category')
+            
             # Merge เพื่อคัดเฉพาะ GL_CODE ที่อยู่ใน Master
-            data_R = pd.merge(of_revenue, master_other_rev, on='GL_CODE', how='inner')
+            data_R = pd.merge(
+                of_revenue.astype({'GL_CODE': gl_code_dtype}),
+                master_other_rev,
+                on='GL_CODE',
+                how='inner'
+            )
             self.logger.success(f"สร้าง Data R เรียบร้อย: {len(data_R)} รายการ")
 
             # --- Step 2: สร้างข้อมูล F (ผลตอบแทนทางการเงิน) ---
@@ -185,6 +240,7 @@ class FIRevenueExpenseProcessor:
             # --- Step 3: สร้างข้อมูล E (ค่าใช้จ่ายอื่น จาก gl_group_expense) ---
             self.logger.info("\n--- Step 3: สร้างข้อมูล E (ค่าใช้จ่ายอื่น) ---")
             data_E = gl_group_expense[gl_group_expense['GROUP_NAME'] == 'ค่าใช้จ่ายอื่น'].copy()
+            data_E['GL_CODE'] = data_E['GL_CODE'].astype(gl_code_dtype)
 
             # Log รายการก่อนคูณ -1
             self.logger.info(f"รายการค่าใช้จ่ายอื่น ({len(data_E)} รายการ) ก่อนคูณ -1:")
@@ -199,33 +255,24 @@ class FIRevenueExpenseProcessor:
             self.logger.info(f"\nหลังคูณ -1:")
             for idx, row in data_E.iterrows():
                 self.logger.info(f"  - GL_CODE: {row['GL_CODE']}, เดือน: {row['VALUE']:>15,.2f}, สะสม: {row['VALUE_YTD']:>15,.2f}")
-            
-            # เลือกเฉพาะ columns ที่ต้องการ
-            data_E_final = data_E[['GL_CODE', 'GL_NAME', 'VALUE', 'VALUE_YTD']].copy()
 
             # --- Step 4: สร้างข้อมูล RE (รวม R กับ E) ---
             self.logger.info("\n--- Step 4: สร้างข้อมูล RE (รวม R + E) ---")
-            # เปลี่ยนชื่อ columns ของ R ให้ตรงกัน
-            data_R_renamed = data_R.rename(columns={
-                'REVENUE_VALUE': 'VALUE',
-                'REVENUE_VALUE_YTD': 'VALUE_YTD'
+            # ต่อคอลัมน์ของ R กับ E โดยตรง (R: REVENUE_VALUE -> VALUE)
+            # ไม่ต้อง rename/copy/concat DataFrame ชั่วคราวของแต่ละฝั่ง
+            data_RE = pd.DataFrame({
+                'GL_CODE': pd.concat([data_R['GL_CODE'], data_E['GL_CODE']], ignore_index=True),
+                'GL_NAME': pd.concat([data_R['GL_NAME'], data_E['GL_NAME']], ignore_index=True),
+                'VALUE': np.concatenate([data_R['REVENUE_VALUE'].to_numpy(), data_E['VALUE'].to_numpy()]),
+                'VALUE_YTD': np.concatenate([data_R['REVENUE_VALUE_YTD'].to_numpy(), data_E['VALUE_YTD'].to_numpy()]),
             })
-
-            # เลือกเฉพาะ columns ที่ต้องการจาก R
-            data_R_for_concat = data_R_renamed[['GL_CODE', 'GL_NAME', 'VALUE', 'VALUE_YTD']].copy()
-
-            # รวม R กับ E
-            data_RE = pd.concat([data_R_for_concat, data_E_final], ignore_index=True)
-            self.logger.success(f"สร้าง Data RE: {len(data_RE)} รายการ (R: {len(data_R_for_concat)}, E: {len(data_E_final)})")
+            self.logger.success(f"สร้าง Data RE: {len(data_RE)} รายการ (R: {len(data_R)}, E: {len(data_E)})")
 
             # --- Step 5: สร้างข้อมูล RE_OTHER (Merge กับ master_revenue_expense_net) ---
             self.logger.info("\n--- Step 5: สร้างข้อมูล RE_OTHER ---")
             
-            master_rev_exp_net_file = os.path.join(
-                self.paths['master'],
-                self.config['master_files']['revenue_expense_net']
-            )
-            master_rev_exp_net = pd.read_csv(master_rev_exp_net_file)
+            master_rev_exp_net_file = self.master_paths['revenue_expense_net']
+            master_rev_exp_net = read_master_csv(master_rev_exp_net_file)
             master_rev_exp_net.columns = master_rev_exp_net.columns.str.strip()
             
             # ทำความสะอาด GROUP
@@ -234,20 +281,26 @@ class FIRevenueExpenseProcessor:
             else:
                 raise KeyError(f"Column 'GROUP' not found in {self.config['master_files']['revenue_expense_net']}")
                 
-            master_rev_exp_net['GL_CODE'] = master_rev_exp_net['GL_CODE'].astype(str)
+            # GL_CODE ที่ไม่อยู่ใน gl_code_dtype จะเป็น NaN ซึ่ง inner join ไม่ match อยู่แล้ว
+            master_rev_exp_net['GL_CODE'] = master_rev_exp_net['GL_CODE'].astype(str).astype(gl_code_dtype)
+            master_rev_exp_net['GROUP'] = master_rev_exp_net['GROUP'].astype('category')
             
             # Merge (inner join - เอาเฉพาะที่ GL_CODE ตรงกัน)
             data_RE_OTHER = pd.merge(data_RE, master_rev_exp_net[["GL_CODE", "SUB_GROUP", "GROUP"]], on='GL_CODE', how='inner')
             self.logger.success(f"สร้าง Data RE_OTHER: {len(data_RE_OTHER)} รายการ")
             self.logger.debug(str(data_RE_OTHER.sum(numeric_only=True)))
 
+            # แบ่งกลุ่มตาม GROUP ครั้งเดียว แล้วดึงตำแหน่งแถวของแต่ละกลุ่มไปใช้ใน Step 6 และ Step 8
+            # (GROUP ที่ไม่มีข้อมูลจะได้ DataFrame ว่างที่มีคอลัมน์ครบ)
+            re_other_group_rows = data_RE_OTHER.groupby('GROUP', sort=False, observed=True).indices
+
             # --- Step 6: แยกข้อมูล R_OTHER (รายได้อื่น) ---
             self.logger.info("\n--- Step 6: แยกข้อมูล R_OTHER (GROUP = รายได้อื่น) ---")
-            data_R_OTHER = data_RE_OTHER[data_RE_OTHER['GROUP'] == 'รายได้อื่น'].copy()
+            data_R_OTHER = data_RE_OTHER.iloc[re_other_group_rows.get('รายได้อื่น', [])]
             self.logger.success(f"พบข้อมูล R_OTHER: {len(data_R_OTHER)} รายการ")
-            self.logger.debug(str(data_R_OTHER.groupby('GROUP').sum(numeric_only=True)))
+            self.logger.debug(str(data_R_OTHER.groupby('GROUP', observed=True).sum(numeric_only=True)))
             
-            data_R_OTHER = data_R_OTHER.groupby(['GROUP', 'SUB_GROUP'], dropna=False).agg({
+            data_R_OTHER = data_R_OTHER.groupby(['GROUP', 'SUB_GROUP'], dropna=False, observed=True).agg({
                 'GL_CODE': 'first',
                 'GL_NAME': 'first',
                 'VALUE': 'sum',
@@ -282,18 +335,23 @@ class FIRevenueExpenseProcessor:
             # --- Step 7: แยก R_OTHER_NET และ R_OTHER_E (แยกระดับคอลัมน์) ---
             self.logger.info("\n--- Step 7: แยก R_OTHER_NET และ R_OTHER_E (แยกระดับคอลัมน์) ---")
 
+            # ดึงเป็น NumPy array ครั้งเดียว แล้ว sum ส่วนบวก/ลบด้วย maximum/minimum
+            # (ไม่ต้องสร้าง boolean mask และ Series ใหม่ทุกครั้งที่ sum; nansum ข้าม NaN เหมือน pandas)
+            values = data_R_OTHER['VALUE'].to_numpy(dtype=float)
+            values_ytd = data_R_OTHER['VALUE_YTD'].to_numpy(dtype=float)
+
             self.logger.info(f"ยอดรวมใน data_R_OTHER (ก่อนแยก):")
-            self.logger.info(f"  VALUE ทั้งหมด: {data_R_OTHER['VALUE'].sum():,.2f}")
-            self.logger.info(f"  VALUE_YTD ทั้งหมด: {data_R_OTHER['VALUE_YTD'].sum():,.2f}")
+            self.logger.info(f"  VALUE ทั้งหมด: {np.nansum(values):,.2f}")
+            self.logger.info(f"  VALUE_YTD ทั้งหมด: {np.nansum(values_ytd):,.2f}")
 
             # คำนวณผลรวมโดยตรง - แยกในระดับคอลัมน์
             # รายได้อื่น (บวก)
-            r_other_net_month = data_R_OTHER.loc[data_R_OTHER['VALUE'] > 0, 'VALUE'].sum()
-            r_other_net_ytd = data_R_OTHER.loc[data_R_OTHER['VALUE_YTD'] > 0, 'VALUE_YTD'].sum()
+            r_other_net_month = np.nansum(np.maximum(values, 0))
+            r_other_net_ytd = np.nansum(np.maximum(values_ytd, 0))
 
             # ค่าใช้จ่ายอื่น (ลบ)
-            r_other_e_month = data_R_OTHER.loc[data_R_OTHER['VALUE'] < 0, 'VALUE'].sum()
-            r_other_e_ytd = data_R_OTHER.loc[data_R_OTHER['VALUE_YTD'] < 0, 'VALUE_YTD'].sum()
+            r_other_e_month = np.nansum(np.minimum(values, 0))
+            r_other_e_ytd = np.nansum(np.minimum(values_ytd, 0))
 
             self.logger.success("R_OTHER_NET (รายได้อื่น - บวก):")
             self.logger.info(f"  เดือน: {r_other_net_month:,.2f}")
@@ -306,17 +364,21 @@ class FIRevenueExpenseProcessor:
             # --- Step 8: สร้าง E_OTHER และ E_OTHER_NET (Logic from script 2) ---
             # This step was missing from the original Program 1 logic
             self.logger.info("\n--- Step 8: สร้าง E_OTHER (ค่าใช้จ่ายอื่น จาก RE_OTHER) ---")
-            data_E_OTHER = data_RE_OTHER[data_RE_OTHER['GROUP'] == 'ค่าใช้จ่ายอื่น'].copy()
+            data_E_OTHER = data_RE_OTHER.iloc[re_other_group_rows.get('ค่าใช้จ่ายอื่น', [])]
             self.logger.success(f"✓ E_OTHER (GROUP = ค่าใช้จ่ายอื่น): {len(data_E_OTHER)} รายการ")
-            self.logger.debug(str(data_E_OTHER.sum(numeric_only=True)))
+            # sum ทุกคอลัมน์ตัวเลขครั้งเดียว แล้วใช้ซ้ำทั้งใน debug log และการคำนวณด้านล่าง
+            e_other_totals = data_E_OTHER.sum(numeric_only=True)
+            self.logger.debug(str(e_other_totals))
+            e_other_month = e_other_totals['VALUE']
+            e_other_ytd = e_other_totals['VALUE_YTD']
 
             # รวม E_OTHER (จาก master_rev_exp_net) กับ R_OTHER_E (จากรายได้ติดลบ)
             # This is the crucial fix
             self.logger.info("  → รวม E_OTHER (จาก Master) + R_OTHER_E (จากรายได้ติดลบ)...")
-            e_other_net_month = data_E_OTHER['VALUE'].sum() + r_other_e_month
-            e_other_net_ytd = data_E_OTHER['VALUE_YTD'].sum() + r_other_e_ytd
+            e_other_net_month = e_other_month + r_other_e_month
+            e_other_net_ytd = e_other_ytd + r_other_e_ytd
             
-            self.logger.info(f"  E_OTHER (เดือน): {data_E_OTHER['VALUE'].sum():,.2f}, R_OTHER_E (เดือน): {r_other_e_month:,.2f}")
+            self.logger.info(f"  E_OTHER (เดือน): {e_other_month:,.2f}, R_OTHER_E (เดือน): {r_other_e_month:,.2f}")
             self.logger.info(f"  E_OTHER_NET (เดือน, ก่อนคูณ -1): {e_other_net_month:,.2f}")
 
             # คูณ -1 
@@ -421,20 +483,18 @@ class FIRevenueExpenseProcessor:
         of_base["VALUE"] = df[11]
         of_base["VALUE_YTD"] = df[13]
         
-        # ทำความสะอาดข้อมูลตัวเลข
+        # ทำความสะอาดข้อมูลตัวเลข (ลบ "," และ ")" และแปลง "(" เป็น "-" ใน pass เดียว)
         for col in ["VALUE", "VALUE_YTD"]:
-            of_base[col] = of_base[col].replace(",", "", regex=True)
-            of_base[col] = of_base[col].replace(r"\(", "-", regex=True)
-            of_base[col] = of_base[col].replace(r"\)", "", regex=True)
+            of_base[col] = pd.to_numeric(
+                of_base[col].astype(str).str.translate(ACCOUNTING_NUMBER_TABLE)
+            )
         
-        of_base["VALUE"] = pd.to_numeric(of_base["VALUE"])
-        of_base["VALUE_YTD"] = pd.to_numeric(of_base["VALUE_YTD"])
         of_base["GL_CODE"] = of_base["GL_CODE"].astype(str)
         
         # --- ประมวลผลส่วนของ Expense ---
         self.log("Processing Expenses...")
         expense_pattern = self.config['processing_rules']['expense_gl_pattern']
-        of_expense = of_base[of_base["GL_CODE"].fillna("").str.match(expense_pattern)].copy()
+        of_expense = of_base[gl_code_mask(of_base["GL_CODE"], expense_pattern)].copy()
         of_expense = of_expense.rename(columns={"VALUE": "EXPENSE_VALUE", "VALUE_YTD": "EXPENSE_VALUE_YTD"})
         
         # Merge กับ Master Expense
@@ -448,8 +508,8 @@ class FIRevenueExpenseProcessor:
         
         # --- ประมวลผลส่วนของ Revenue ---
         self.log("Processing Revenues...")
-        revenue_pattern = self.config['processing_rules']['revenue_gl_pattern']
-        of_revenue = of_base[of_base["GL_CODE"].str.startswith("4")].copy()
+        revenue_pattern = self.config['processing_rules'].get('revenue_gl_pattern', '^4')
+        of_revenue = of_base[gl_code_mask(of_base["GL_CODE"], revenue_pattern)].copy()
         of_revenue = of_revenue.rename(columns={"VALUE": "REVENUE_VALUE", "VALUE_YTD": "REVENUE_VALUE_YTD"})
         
         # Merge กับ Master Revenue
@@ -499,67 +559,39 @@ class FIRevenueExpenseProcessor:
             self.log(f"✓ บันทึก CSV: {self.config['output_files']['csv_revenue']}", "SUCCESS")
             
             # บันทึก Excel file
+            # ใช้ constant_memory ให้ xlsxwriter stream แถวลงดิสก์ทีละแถว (ไม่เก็บทั้ง workbook ใน RAM)
+            # โหมดนี้ต้องเขียนเรียงแถว จึงเขียนผ่าน _write_sheet แทน DataFrame.to_excel (ซึ่งเขียนทีละคอลัมน์)
             excel_path = os.path.join(self.paths['output'], self.config['output_files']['excel'])
-            writer = pd.ExcelWriter(excel_path, engine='xlsxwriter')
+            workbook = xlsxwriter.Workbook(excel_path, {'constant_memory': True, 'use_zip64': True})
+            number_format = workbook.add_format({'num_format': '#,##0.00'})
+            # หัวตารางแบบเดียวกับที่ DataFrame.to_excel เขียน (ตัวหนา มีกรอบ จัดกึ่งกลาง)
+            header_format = workbook.add_format({'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'})
             
             # เขียนชีต Expense
-            results['of_expense'].to_excel(writer, sheet_name="expense_data", index=False)
-            results['gl_group_expense'].to_excel(writer, sheet_name="expense_gl_group_data", index=False)
-            results['gl_group_by_expense'].to_excel(writer, sheet_name="expense_gl_group", index=False)
+            self._write_sheet(workbook, "expense_data", results['of_expense'], header_format,
+                              [(1, 2, 18, number_format)])
+            self._write_sheet(workbook, "expense_gl_group_data", results['gl_group_expense'], header_format,
+                              [(0, 0, 12, None), (1, 1, 36, None), (2, 2, 9, None), (3, 3, 36, None),
+                               (4, 5, 18, number_format)])
+            self._write_sheet(workbook, "expense_gl_group", results['gl_group_by_expense'], header_format,
+                              [(0, 0, 12, None), (1, 1, 36, None), (2, 3, 18, number_format)])
             
             # เขียนชีต Revenue
-            results['of_revenue'].to_excel(writer, sheet_name="revenue_data", index=False)
-            results['gl_group_revenue'].to_excel(writer, sheet_name="revenue_gl_group_data", index=False)
-            results['gl_group_by_revenue'].to_excel(writer, sheet_name="revenue_gl_group", index=False)
+            self._write_sheet(workbook, "revenue_data", results['of_revenue'], header_format,
+                              [(1, 2, 18, number_format)])
+            self._write_sheet(workbook, "revenue_gl_group_data", results['gl_group_revenue'], header_format,
+                              [(0, 0, 12, None), (1, 1, 36, None), (2, 3, 36, None), (4, 5, 18, number_format)])
+            self._write_sheet(workbook, "revenue_gl_group", results['gl_group_by_revenue'], header_format,
+                              [(0, 0, 12, None), (1, 1, 36, None), (2, 3, 18, number_format)])
             
             # เขียนชีตสรุปรายได้/ค่าใช้จ่ายอื่น
             if results['summary_other_fin_df'] is not None:
-                results['summary_other_fin_df'].to_excel(writer, sheet_name="summary_other", index=False)
+                self._write_sheet(workbook, "summary_other", results['summary_other_fin_df'], header_format,
+                                  [(0, 0, 35, None), (1, 2, 20, number_format)])
             else:
                 self.log("⚠️ ไม่สามารถสร้างชีต summary_other ได้ เนื่องจากข้อมูลเป็น None", "WARNING")
             
-            # จัดรูปแบบ Excel
-            workbook = writer.book
-            number_format = workbook.add_format({'num_format': '#,##0.00'})
-            
-            # จัดรูปแบบชีต Expense
-            worksheet_data_exp = writer.sheets["expense_data"]
-            worksheet_gl_group_data_exp = writer.sheets["expense_gl_group_data"]
-            worksheet_gl_group_by_exp = writer.sheets["expense_gl_group"]
-            
-            worksheet_data_exp.set_column(1, 2, 18, number_format)
-            worksheet_gl_group_data_exp.set_column(0, 0, 12)
-            worksheet_gl_group_data_exp.set_column(1, 1, 36)
-            worksheet_gl_group_data_exp.set_column(2, 2, 9)
-            worksheet_gl_group_data_exp.set_column(3, 3, 36)
-            worksheet_gl_group_data_exp.set_column(4, 5, 18, number_format)
-            
-            worksheet_gl_group_by_exp.set_column(0, 0, 12)
-            worksheet_gl_group_by_exp.set_column(1, 1, 36)
-            worksheet_gl_group_by_exp.set_column(2, 3, 18, number_format)
-            
-            # จัดรูปแบบชีต Revenue
-            worksheet_data_rev = writer.sheets["revenue_data"]
-            worksheet_gl_group_data_rev = writer.sheets["revenue_gl_group_data"]
-            worksheet_gl_group_by_rev = writer.sheets["revenue_gl_group"]
-            
-            worksheet_data_rev.set_column(1, 2, 18, number_format)
-            worksheet_gl_group_data_rev.set_column(0, 0, 12)
-            worksheet_gl_group_data_rev.set_column(1, 1, 36)
-            worksheet_gl_group_data_rev.set_column(2, 3, 36)
-            worksheet_gl_group_data_rev.set_column(4, 5, 18, number_format)
-            
-            worksheet_gl_group_by_rev.set_column(0, 0, 12)
-            worksheet_gl_group_by_rev.set_column(1, 1, 36)
-            worksheet_gl_group_by_rev.set_column(2, 3, 18, number_format)
-            
-            # จัดรูปแบบชีตสรุป summary_other
-            if results['summary_other_fin_df'] is not None:
-                worksheet_summary = writer.sheets["summary_other"]
-                worksheet_summary.set_column(0, 0, 35)
-                worksheet_summary.set_column(1, 2, 20, number_format)
-            
-            writer.close()
+            workbook.close()
             
             self.log(f"✓ บันทึก Excel: {self.config['output_files']['excel']}", "SUCCESS")
             self.log(f"✓ Successfully combined output to {excel_path}", "SUCCESS")
@@ -571,6 +603,41 @@ class FIRevenueExpenseProcessor:
             traceback.print_exc()
             return False
     
+    @staticmethod
+    def _write_sheet(workbook, sheet_name: str, df: pd.DataFrame, header_format, column_formats) -> None:
+        """
+        เขียน DataFrame ลงชีตใหม่ทีละแถว (รองรับ workbook แบบ constant_memory)
+        
+        Args:
+            workbook: xlsxwriter Workbook
+            sheet_name: ชื่อชีต
+            df: ข้อมูลที่จะเขียน (ไม่รวม index)
+            header_format: format ของแถวหัวตาราง
+            column_formats: list ของ (first_col, last_col, width, format) สำหรับ set_column
+        """
+        worksheet = workbook.add_worksheet(sheet_name)
+        # constant_memory: ต้องตั้งค่าคอลัมน์ก่อนเขียนข้อมูล
+        for first_col, last_col, width, cell_format in column_formats:
+            worksheet.set_column(first_col, last_col, width, cell_format)
+        
+        worksheet.write_row(0, 0, [str(col) for col in df.columns], header_format)
+        # แปลงทีละคอลัมน์เป็น list ของค่า Python แล้ว zip เป็นแถว (ไม่ผ่าน ExcelFormatter ของ pandas)
+        # เฉพาะคอลัมน์ที่มี NaN เท่านั้นที่ต้องแปลง NaN -> None เพื่อให้เป็นเซลล์ว่างเหมือน to_excel
+        # ส่วน ±inf ให้เขียนเป็นข้อความ 'inf'/'-inf' เหมือน to_excel (xlsxwriter จะ error ถ้าเขียน inf ตรงๆ)
+        columns = []
+        for _, series in df.items():
+            if series.dtype.kind == 'f' and np.isinf(series.to_numpy()).any():
+                values = series.to_numpy()
+                series = series.astype(object)
+                series[values == np.inf] = 'inf'
+                series[values == -np.inf] = '-inf'
+            if series.hasnans:
+                columns.append(series.astype(object).where(series.notna(), None).tolist())
+            else:
+                columns.append(series.tolist())
+        for row_idx, row in enumerate(zip(*columns), start=1):
+            worksheet.write_row(row_idx, 0, row)
+    
     def run(self) -> bool:
         """
         รันกระบวนการประมวลผลทั้งหมด
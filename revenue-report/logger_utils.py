@@ -9,6 +9,7 @@ Version: 1.0.0
 """
 
 import logging
+import logging.handlers
 import sys
 from pathlib import Path
 from datetime import datetime
@@ -25,6 +26,10 @@ class ETLLogger:
 
     _instances = {}  # Singleton per module
 
+    # ขนาดสูงสุดของ log file ก่อน rotate และจำนวนไฟล์ backup ที่เก็บไว้
+    MAX_LOG_BYTES = 10 * 1024 * 1024
+    LOG_BACKUP_COUNT = 5
+
     def __init__(self, name: str, log_dir: str = "logs", enable_file_logging: bool = True):
         """
         Initialize Logger
@@ -69,7 +74,14 @@ class ETLLogger:
             today = datetime.now().strftime('%Y%m%d')
             log_file = self.log_dir / f"{self.name}_{today}.log"
 
-            file_handler = logging.FileHandler(log_file, encoding='utf-8')
+            # Rotate เมื่อไฟล์ใหญ่เกินกำหนด และเปิดไฟล์เมื่อมีการเขียนครั้งแรกเท่านั้น (delay=True)
+            file_handler = logging.handlers.RotatingFileHandler(
+                log_file,
+                maxBytes=self.MAX_LOG_BYTES,
+                backupCount=self.LOG_BACKUP_COUNT,
+                encoding='utf-8',
+                delay=True
+            )
             file_handler.setLevel(logging.DEBUG)  # บันทึกทุก level ลงไฟล์
             file_handler.setFormatter(formatter)
             self.logger.addHandler(file_handler)
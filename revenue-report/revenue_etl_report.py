@@ -5,11 +5,24 @@ import os
 from pathlib import Path
 from datetime import datetime
 import platform
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any
 from revenue_reconciliation import RevenueReconciliation, ReconciliationError
 from logger_utils import ETLLogger
 
 
+def format_int_codes(values: pd.Series, width: int = 0) -> pd.Series:
+    """
+    แปลงคอลัมน์รหัสตัวเลข (เช่น MONTH, SUB_PRODUCT_KEY) เป็น string เติม 0 ข้างหน้าให้ครบ width หลัก
+    
+    ผลลัพธ์เหมือน .astype(int).astype(str).str.zfill(width) แต่ format เฉพาะค่าที่ไม่ซ้ำ
+    แล้ว map กลับด้วย index (คอลัมน์เหล่านี้มีค่าไม่ซ้ำน้อยมากเมื่อเทียบกับจำนวนแถว)
+    """
+    codes, uniques = pd.factorize(values.astype(int))
+    labels = np.array([f"{value:0{width}d}" for value in uniques], dtype=object)
+    return pd.Series(labels[codes], index=values.index, name=values.name, dtype=str)
+
+
 # ============================================================================
 # CONFIG ADAPTER - แปลง dict config เป็น object-like access
 # ============================================================================
@@ -397,14 +410,10 @@ class RevenueETL:
         
         self.log(f"พบไฟล์ทั้งหมด {len(files)} ไฟล์")
         
-        df_combined = pd.DataFrame()
-        
-        for file in files:
-            self.log(f"กำลังอ่านไฟล์: {os.path.basename(file)}")
-            
-            # อ่านไฟล์
+        def read_source_file(file):
+            """อ่านไฟล์ต้นทาง 1 ไฟล์ คืนค่า (DataFrame, None) หรือ (None, exception)"""
             try:
-                df = pd.read_csv(
+                return pd.read_csv(
                     file,
                     converters={
                         "YEAR": str,
@@ -414,9 +423,25 @@ class RevenueETL:
                         "PRODUCT_KEY": str,
                         "SUB_PRODUCT_KEY": int
                     }
-                )
+                ), None
             except Exception as e:
-                self.log(f"  ❌ เกิดข้อผิดพลาดในการอ่านไฟล์ {file}: {e} - ข้ามไฟล์นี้")
+                return None, e
+        
+        # อ่านทุกไฟล์พร้อมกันด้วย thread pool (I/O และ C parser ทำงานซ้อนกันได้)
+        # executor.map คืนผลตามลำดับไฟล์เดิม จึง log และรวมข้อมูลในลำดับเดียวกับก่อนหน้า
+        max_workers = min(len(files), os.cpu_count() or 1, 8)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            loaded_files = list(executor.map(read_source_file, files))
+        
+        # เก็บ DataFrame ของแต่ละไฟล์ไว้ แล้ว concat ครั้งเดียวตอนท้าย
+        # (concat ทีละไฟล์จะ copy ข้อมูลที่รวมไว้แล้วซ้ำทุกรอบ)
+        file_frames = []
+        
+        for file, (df, read_error) in zip(files, loaded_files):
+            self.log(f"กำลังอ่านไฟล์: {os.path.basename(file)}")
+            
+            if read_error is not None:
+                self.log(f"  ❌ เกิดข้อผิดพลาดในการอ่านไฟล์ {file}: {read_error} - ข้ามไฟล์นี้")
                 continue
             
             # จัดการชื่อคอลัมน์
@@ -428,11 +453,12 @@ class RevenueETL:
             
             # จัดการ REVENUE_VALUE
             df = df.dropna(subset=["REVENUE_VALUE"])
-            df["REVENUE_VALUE"] = df["REVENUE_VALUE"].astype(str)
-            df["REVENUE_VALUE"] = df["REVENUE_VALUE"].str.replace(",", "", regex=False)
-            df["REVENUE_VALUE"] = df["REVENUE_VALUE"].str.replace(r"\(", "-", regex=True)
-            df["REVENUE_VALUE"] = df["REVENUE_VALUE"].str.replace(r"\)", "", regex=True)
-            df["REVENUE_VALUE"] = df["REVENUE_VALUE"].str.replace(" ", "", regex=False)
+            # ลบ ",", ")" และช่องว่างใน pass เดียว แล้วแปลง "(" เป็นเครื่องหมายลบ
+            df["REVENUE_VALUE"] = (
+                df["REVENUE_VALUE"].astype(str)
+                .str.replace(r"[, )]", "", regex=True)
+                .str.replace("(", "-", regex=False)
+            )
             df["REVENUE_VALUE"] = pd.to_numeric(df["REVENUE_VALUE"], errors='coerce')
             
             # จัดการ GL_CODE และ GL_CODE_NT1
@@ -464,11 +490,13 @@ class RevenueETL:
             self.log(f"  ยอดรวมของไฟล์นี้: {file_total:,.2f}")
             self.log(f"  จำนวนแถว: {len(df):,}")
             
-            df_combined = pd.concat([df_combined, df], ignore_index=True)
+            file_frames.append(df)
+        
+        df_combined = pd.concat(file_frames, ignore_index=True) if file_frames else pd.DataFrame()
         
         # แปลง MONTH เป็น string แบบ 2 หลัก
-        df_combined["MONTH"] = df_combined["MONTH"].astype(int).astype(str).str.zfill(2)
-        df_combined["SUB_PRODUCT_KEY"] = df_combined["SUB_PRODUCT_KEY"].astype(int).astype(str)
+        df_combined["MONTH"] = format_int_codes(df_combined["MONTH"], 2)
+        df_combined["SUB_PRODUCT_KEY"] = format_int_codes(df_combined["SUB_PRODUCT_KEY"])
 
         # === [NEW] Month Filtering: กรองข้อมูลตามช่วงเดือนที่กำหนด ===
         # ถ้ามี end_month ใน config ให้กรองเฉพาะเดือนที่ต้องการ
@@ -511,7 +539,8 @@ class RevenueETL:
         
         # บันทึกไฟล์
         output_file = os.path.join(self.paths["output"], self.config.OUTPUT_CONCAT_FILE)
-        df_combined.to_csv(output_file, index=False, float_format="%.2f")
+        # round ครั้งเดียวแล้วให้ CSV writer ใช้ C path (float_format บังคับ format ทีละเซลล์ใน Python)
+        df_combined.round(2).to_csv(output_file, index=False)
         
         self.log(f"บันทึกไฟล์: {output_file}")
         self.log(f"รวมไฟล์เสร็จสิ้น - จำนวนแถวทั้งหมด: {len(df_combined):,}")
@@ -547,7 +576,7 @@ class RevenueETL:
         
         # บันทึกไฟล์
         output_file = os.path.join(self.paths["output"], self.config.OUTPUT_MAPPED_CC_FILE)
-        df.to_csv(output_file, index=False, float_format="%.2f")
+        df.round(2).to_csv(output_file, index=False)
         
         self.log(f"บันทึกไฟล์: {output_file}")
         self.log(f"Mapping Cost Center เสร็จสิ้น", df["REVENUE_VALUE"].sum())
@@ -583,8 +612,8 @@ class RevenueETL:
                                   "PRODUCT_KEY", "SUB_PRODUCT_KEY"]]
         
         # แปลงเป็น int แล้วกลับเป็น str (เพื่อตัด 0 ข้างหน้า)
-        df_mapping["SUB_PRODUCT_KEY_OLD"] = df_mapping["SUB_PRODUCT_KEY_OLD"].astype(int).astype(str)
-        df_mapping["SUB_PRODUCT_KEY"] = df_mapping["SUB_PRODUCT_KEY"].astype(int).astype(str)
+        df_mapping["SUB_PRODUCT_KEY_OLD"] = format_int_codes(df_mapping["SUB_PRODUCT_KEY_OLD"])
+        df_mapping["SUB_PRODUCT_KEY"] = format_int_codes(df_mapping["SUB_PRODUCT_KEY"])
         
         # สร้าง composite key
         df["product_key_sub_product"] = df["PRODUCT_KEY"] + df["SUB_PRODUCT_KEY"]
@@ -631,7 +660,7 @@ class RevenueETL:
         
         # บันทึกไฟล์
         output_file = os.path.join(self.paths["output"], self.config.OUTPUT_MAPPED_PRODUCT_FILE)
-        df.to_csv(output_file, index=False, float_format="%.2f")
+        df.round(2).to_csv(output_file, index=False)
         
         self.log(f"บันทึกไฟล์: {output_file}")
         self.log(f"Mapping Product เสร็จสิ้น", df["REVENUE_VALUE"].sum())
@@ -742,7 +771,7 @@ class RevenueETL:
             return pd.DataFrame()
             
         df_adj['YEAR'] = df_adj['YEAR'].astype(str)
-        df_adj['MONTH'] = df_adj['MONTH'].astype(int).astype(str).str.zfill(2)
+        df_adj['MONTH'] = format_int_codes(df_adj['MONTH'], 2)
         
         # [ START FIX ]
         # จัดการคอลัมน์ 'TYPE' และ 'REVENUE_TYPE' ที่อาจซ้ำซ้อนกัน
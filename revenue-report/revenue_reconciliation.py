@@ -4,6 +4,10 @@ from datetime import datetime
 from pathlib import Path
 
 
+# รูปแบบบรรทัด error ใน summary log (คีย์ตาม dict ที่ _reconcile_by_gl คืนมา)
+ERROR_LINE_FORMAT = "{gl_code:<12} {fi_value:>18,.2f} {trn_value:>18,.2f} {diff:>18,.2f} {source:<10}\n"
+
+
 class RevenueReconciliation:
     """
     Module สำหรับตรวจสอบความถูกต้องของข้อมูล Revenue
@@ -54,39 +58,47 @@ class RevenueReconciliation:
             self.log(f"❌ ไม่พบไฟล์ FI: {fi_file_path}", "ERROR")
             raise FileNotFoundError(f"ไม่พบไฟล์ FI: {fi_file_path}")
         
-        # อ่านข้อมูลจากงบการเงิน (FI)
+        # อ่านข้อมูลจากงบการเงิน (FI) - อ่านเฉพาะคอลัมน์ที่ใช้ และอ่าน GL_CODE เป็น string ตั้งแต่ตอน parse
+        required_fi_cols = ['GL_CODE', 'REVENUE_VALUE', 'REVENUE_VALUE_YTD']
         self.log(f"อ่านข้อมูลจากงบการเงิน: {Path(fi_file_path).name}")
         try:
-            df_fi = pd.read_csv(fi_file_path)
+            df_fi = pd.read_csv(
+                fi_file_path,
+                usecols=lambda col: col in required_fi_cols,
+                dtype={'GL_CODE': str}
+            )
             self.log(f"✓ อ่านข้อมูล FI สำเร็จ: {len(df_fi):,} GL Codes")
         except Exception as e:
             self.log(f"❌ ไม่สามารถอ่านไฟล์ FI: {e}", "ERROR")
             raise
         
         # ตรวจสอบโครงสร้างไฟล์ FI
-        required_fi_cols = ['GL_CODE', 'REVENUE_VALUE', 'REVENUE_VALUE_YTD']
         missing_cols = [col for col in required_fi_cols if col not in df_fi.columns]
         if missing_cols:
             self.log(f"❌ ไฟล์ FI ขาดคอลัมน์: {missing_cols}", "ERROR")
             raise ValueError(f"ไฟล์ FI ขาดคอลัมน์: {missing_cols}")
         
-        # อ่านข้อมูลจาก Transaction (TRN)
+        # อ่านข้อมูลจาก Transaction (TRN) - อ่านเฉพาะคอลัมน์ที่ใช้ (ไฟล์ TRN มีคอลัมน์อื่นอีกมาก)
+        required_trn_cols = ['GL_CODE', 'YEAR', 'MONTH', 'REVENUE_VALUE']
         self.log(f"อ่านข้อมูลจาก Transaction: {Path(trn_file_path).name}")
         try:
-            df_trn = pd.read_csv(trn_file_path)
+            df_trn = pd.read_csv(
+                trn_file_path,
+                usecols=lambda col: col in required_trn_cols,
+                dtype={'GL_CODE': str}
+            )
             self.log(f"✓ อ่านข้อมูล TRN สำเร็จ: {len(df_trn):,} records")
         except Exception as e:
             self.log(f"❌ ไม่สามารถอ่านไฟล์ TRN: {e}", "ERROR")
             raise
         
         # ตรวจสอบโครงสร้างไฟล์ TRN
-        required_trn_cols = ['GL_CODE', 'YEAR', 'MONTH', 'REVENUE_VALUE']
         missing_cols = [col for col in required_trn_cols if col not in df_trn.columns]
         if missing_cols:
             self.log(f"❌ ไฟล์ TRN ขาดคอลัมน์: {missing_cols}", "ERROR")
             raise ValueError(f"ไฟล์ TRN ขาดคอลัมน์: {missing_cols}")
         
-        # แปลง GL_CODE เป็น string
+        # ตัดช่องว่างของ GL_CODE (อ่านเป็น string มาแล้ว; astype(str) เผื่อกรณีค่าว่าง)
         df_fi['GL_CODE'] = df_fi['GL_CODE'].astype(str).str.strip()
         df_trn['GL_CODE'] = df_trn['GL_CODE'].astype(str).str.strip()
         
@@ -109,15 +121,22 @@ class RevenueReconciliation:
         self.log(f"FI - ยอดสะสม (YTD): {total_fi_ytd:,.2f}")
         
         # สรุปข้อมูล TRN
-        df_trn_latest = df_trn[(df_trn['YEAR'] == latest_year) & (df_trn['MONTH'] == latest_month)]
         df_trn_ytd = df_trn[df_trn['YEAR'] == latest_year]
-        
-        # Aggregate TRN ตาม GL_CODE
-        trn_monthly = df_trn_latest.groupby('GL_CODE')['REVENUE_VALUE'].sum().reset_index()
-        trn_monthly.columns = ['GL_CODE', 'TRN_MONTHLY']
-        
-        trn_ytd = df_trn_ytd.groupby('GL_CODE')['REVENUE_VALUE'].sum().reset_index()
-        trn_ytd.columns = ['GL_CODE', 'TRN_YTD']
+        is_latest = df_trn_ytd['MONTH'] == latest_month
+        
+        # Aggregate TRN ตาม GL_CODE - groupby ครั้งเดียวได้ทั้งยอดรายเดือนและยอดสะสม
+        trn_agg = df_trn_ytd.assign(
+            TRN_MONTHLY=df_trn_ytd['REVENUE_VALUE'].where(is_latest, 0),
+            HAS_LATEST=is_latest
+        ).groupby('GL_CODE', sort=False).agg(
+            TRN_MONTHLY=('TRN_MONTHLY', 'sum'),
+            TRN_YTD=('REVENUE_VALUE', 'sum'),
+            HAS_LATEST=('HAS_LATEST', 'any')
+        ).reset_index()
+        
+        # ยอดรายเดือนเอาเฉพาะ GL_CODE ที่มีรายการในเดือนล่าสุด (เหมือนการ filter ก่อน groupby)
+        trn_monthly = trn_agg.loc[trn_agg['HAS_LATEST'], ['GL_CODE', 'TRN_MONTHLY']]
+        trn_ytd = trn_agg[['GL_CODE', 'TRN_YTD']]
         
         total_trn_monthly = trn_monthly['TRN_MONTHLY'].sum()
         total_trn_ytd = trn_ytd['TRN_YTD'].sum()
@@ -216,46 +235,51 @@ class RevenueReconciliation:
         Returns:
             dict: {'passed': bool, 'errors': list, 'error_count': int, 'total_records': int}
         """
-        # Merge ข้อมูล
-        df_compare = pd.merge(
-            df_fi,
-            df_trn,
-            on='GL_CODE',
-            how='outer',
-            indicator=True
-        )
+        df_compare = self._align_by_gl(df_fi, df_trn)
+        if df_compare is None:
+            # Merge ข้อมูล
+            df_compare = pd.merge(
+                df_fi,
+                df_trn,
+                on='GL_CODE',
+                how='outer',
+                indicator=True
+            )
         
         # แทนที่ NaN ด้วย 0
         df_compare['FI_VALUE'] = df_compare['FI_VALUE'].fillna(0)
         df_compare['TRN_VALUE'] = df_compare['TRN_VALUE'].fillna(0)
+        fi_values = df_compare['FI_VALUE'].to_numpy(dtype=float)
+        trn_values = df_compare['TRN_VALUE'].to_numpy(dtype=float)
         
-        # คำนวณความแตกต่าง
+        # คำนวณความแตกต่างบน NumPy array (round แบบ in-place ไม่สร้าง Series ชั่วคราว)
         # [FIX] Round to 2 decimal places to avoid floating point precision issues
-        df_compare['DIFF'] = (df_compare['FI_VALUE'] - df_compare['TRN_VALUE']).round(2)
-        df_compare['ABS_DIFF'] = df_compare['DIFF'].abs()
+        diff = np.subtract(fi_values, trn_values)
+        np.round(diff, 2, out=diff)
+        abs_diff = np.abs(diff)
+        df_compare['DIFF'] = diff
+        df_compare['ABS_DIFF'] = abs_diff
         
         # หา errors (ความแตกต่างที่มากกว่า tolerance)
-        df_errors = df_compare[df_compare['ABS_DIFF'] > tolerance].copy()
-        
-        errors = []
-        for _, row in df_errors.iterrows():
-            error_detail = {
-                'gl_code': row['GL_CODE'],
-                'fi_value': row['FI_VALUE'],
-                'trn_value': row['TRN_VALUE'],
-                'diff': row['DIFF'],
-                'abs_diff': row['ABS_DIFF'],
-                'source': row['_merge']  # 'left_only', 'right_only', 'both'
-            }
-            errors.append(error_detail)
+        df_errors = df_compare[abs_diff > tolerance]
+        
+        # สร้าง error list ด้วย to_dict แทนการวน iterrows (ไม่ต้องสร้าง Series ทีละแถว)
+        errors = df_errors[['GL_CODE', 'FI_VALUE', 'TRN_VALUE', 'DIFF', 'ABS_DIFF', '_merge']].rename(columns={
+            'GL_CODE': 'gl_code',
+            'FI_VALUE': 'fi_value',
+            'TRN_VALUE': 'trn_value',
+            'DIFF': 'diff',
+            'ABS_DIFF': 'abs_diff',
+            '_merge': 'source'  # 'left_only', 'right_only', 'both'
+        }).to_dict(orient='records')
         
         # สรุปผล
         total_records = len(df_compare)
         error_count = len(errors)
 
         # สถิติ
-        total_fi = df_compare['FI_VALUE'].sum()
-        total_trn = df_compare['TRN_VALUE'].sum()
+        total_fi = fi_values.sum()
+        total_trn = trn_values.sum()
         total_diff = round(total_fi - total_trn, 2)
 
         self.log(f"  Total Records: {total_records:,}")
@@ -269,7 +293,7 @@ class RevenueReconciliation:
 
         if is_gl_offset:
             # ตรวจสอบว่าเป็นการปรับโยกจริงหรือไม่ (ผลรวมของ diff ต้องเป็น 0)
-            sum_of_diffs = sum([e['diff'] for e in errors])
+            sum_of_diffs = df_errors['DIFF'].sum()
             if abs(sum_of_diffs) <= tolerance:
                 self.log(f"  ⚠️  พบการปรับโยก GL: {error_count} รายการ (ยอดรวมเท่ากัน)", "WARNING")
                 self.log(f"  💡 นี่คือการปรับปรุงบัญชี (GL Adjustment) - ถือว่าผ่าน", "INFO")
@@ -309,6 +333,35 @@ class RevenueReconciliation:
             'status': reconcile_status  # 'PASSED', 'PASSED_WITH_GL_OFFSET', 'FAILED'
         }
     
+    @staticmethod
+    def _align_by_gl(df_fi, df_trn):
+        """
+        จับคู่ FI กับ TRN ตาม GL_CODE โดยไม่ต้อง outer merge ในกรณีปกติ
+        (GL_CODE ไม่ซ้ำทั้งสองฝั่ง และเป็นชุดเดียวกัน = ทุกแถวเป็น 'both')
+        
+        Returns:
+            DataFrame: รูปแบบเดียวกับผล outer merge (เรียงตาม GL_CODE, มีคอลัมน์ _merge)
+            None: ถ้าไม่เข้าเงื่อนไข ให้ผู้เรียกใช้ outer merge ตามเดิม
+        """
+        fi_codes = df_fi['GL_CODE']
+        trn_codes = df_trn['GL_CODE']
+        if not (
+            len(fi_codes) == len(trn_codes)
+            and fi_codes.is_unique
+            and trn_codes.is_unique
+            and fi_codes.isin(trn_codes).all()
+        ):
+            return None
+        
+        df_compare = df_fi.sort_values('GL_CODE', ignore_index=True)
+        df_compare['TRN_VALUE'] = (
+            df_trn.set_index('GL_CODE')['TRN_VALUE'].reindex(df_compare['GL_CODE']).to_numpy()
+        )
+        df_compare['_merge'] = pd.Categorical(
+            ['both'] * len(df_compare), categories=['left_only', 'right_only', 'both']
+        )
+        return df_compare
+    
     def _display_errors(self, errors, reconcile_type, max_display=10):
         """แสดงรายละเอียด errors"""
         self.log(f"\n  รายละเอียดความแตกต่าง ({reconcile_type}) - แสดง {min(len(errors), max_display)} รายการแรก:")
@@ -367,7 +420,8 @@ class RevenueReconciliation:
         # บันทึก Summary Log (Text)
         summary_file = log_dir / f"reconcile_summary_{self.config['year']}_{timestamp}.txt"
         self.log(f"📁 Log Directory: {log_dir}")
-        with open(summary_file, 'w', encoding='utf-8') as f:
+        # ใช้ buffer ขนาดใหญ่ เพื่อรวมการเขียนบรรทัด error จำนวนมากเป็น write ก้อนใหญ่ไม่กี่ครั้ง
+        with open(summary_file, 'w', encoding='utf-8', buffering=1 << 20) as f:
             f.write("=" * 80 + "\n")
             f.write("REVENUE RECONCILIATION REPORT\n")
             f.write("=" * 80 + "\n\n")
@@ -394,14 +448,7 @@ class RevenueReconciliation:
                 f.write("-" * 80 + "\n")
                 f.write(f"{'GL_CODE':<12} {'FI':>18} {'TRN':>18} {'DIFF':>18} {'SOURCE':<10}\n")
                 f.write("-" * 80 + "\n")
-                for err in monthly['errors']:
-                    f.write(
-                        f"{err['gl_code']:<12} "
-                        f"{err['fi_value']:>18,.2f} "
-                        f"{err['trn_value']:>18,.2f} "
-                        f"{err['diff']:>18,.2f} "
-                        f"{err['source']:<10}\n"
-                    )
+                f.writelines(ERROR_LINE_FORMAT.format(**err) for err in monthly['errors'])
                 f.write("\n")
             
             # YTD Result
@@ -421,14 +468,7 @@ class RevenueReconciliation:
                 f.write("-" * 80 + "\n")
                 f.write(f"{'GL_CODE':<12} {'FI':>18} {'TRN':>18} {'DIFF':>18} {'SOURCE':<10}\n")
                 f.write("-" * 80 + "\n")
-                for err in ytd['errors']:
-                    f.write(
-                        f"{err['gl_code']:<12} "
-                        f"{err['fi_value']:>18,.2f} "
-                        f"{err['trn_value']:>18,.2f} "
-                        f"{err['diff']:>18,.2f} "
-                        f"{err['source']:<10}\n"
-                    )
+                f.writelines(ERROR_LINE_FORMAT.format(**err) for err in ytd['errors'])
                 f.write("\n")
             
             f.write("=" * 80 + "\n")
@@ -3,10 +3,16 @@ import pandas as pd
 import sys
 
 csv_file = '001_ต้นทุน_Product_1025 - 10-11-68.csv'
-df = pd.read_csv(csv_file, encoding='cp874', sep='\t')
+# ต้องการดูแค่ 9 แถวแรก ไม่ต้อง parse ทั้งไฟล์
+df = pd.read_csv(csv_file, encoding='cp874', sep='\t', nrows=9)
+
+# นับจำนวนแถวจากจำนวนบรรทัด (ไม่รวม header และบรรทัดว่าง) แทนการ parse ทั้งไฟล์
+# ข้ามเฉพาะบรรทัดว่าง (หรือมีแต่ช่องว่าง) เหมือน pandas บรรทัดที่มีแต่ tab ยังนับเป็นแถว
+with open(csv_file, 'rb') as f:
+    total_rows = sum(1 for line in f if line.strip(b' \r\n')) - 1
 
 print('=== CSV Shape ===')
-print(f'Rows: {len(df)}, Columns: {len(df.columns)}')
+print(f'Rows: {total_rows}, Columns: {len(df.columns)}')
 
 print('\n=== Row 0-8 (Headers) ===')
 for i in range(min(9, len(df))):
@@ -8,12 +8,17 @@ import pandas as pd
 import openpyxl
 from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
 from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.dimensions import ColumnDimension
+from concurrent.futures import ProcessPoolExecutor
 from copy import copy
+import mmap
 import os
 
 # ================= CONFIGURATION =================
 EXCEL_HEADER_ROW = 5   # บรรทัดหัวตารางใน Template
 DATA_START_ROW = 6     # บรรทัดเริ่มเขียนข้อมูล
+HEADER_SCAN_BYTES = 64 * 1024  # ขนาดช่วงแรกที่ค้นหา Header ของ CSV (ขยายทีละเท่าถ้าไม่เจอ)
+ACCOUNTING_NUMBER_FORMAT = '_(* #,##0.00_);_(* (#,##0.00);_(* "-"??_);_(@_)'
 
 CSV_MAPPING = [
     {
@@ -49,78 +54,133 @@ CSV_MAPPING = [
 ]
 # =================================================
 
-def clean_sap_value(value):
-    """แปลงค่าตัวเลขจาก SAP (1,234.00-) เป็น float (-1234.00)"""
-    if pd.isna(value) or str(value).strip() == '':
-        return None
-    
-    s_val = str(value).strip().replace(',', '') # เอา comma ออก
+def clean_sap_column(series):
+    """
+    แปลงค่าตัวเลขจาก SAP ทั้งคอลัมน์ทีเดียว (vectorized)
+    - ค่าว่าง -> None
+    - ตัวเลข SAP (1,234.00-) -> float (-1234.00)
+    - ค่าที่แปลงเป็นตัวเลขไม่ได้ -> คงค่าเดิมไว้
+    """
+    text = series.astype(str).str.strip().str.replace(',', '', regex=False)
+    blank = series.isna() | (text == '')
     
     # จัดการเครื่องหมายลบข้างหลัง
-    if s_val.endswith('-'):
-        try:
-            return -float(s_val[:-1])
-        except:
-            return value
+    negative = text.str.endswith('-')
+    numbers = pd.to_numeric(text.mask(negative, text.str[:-1]), errors='coerce').astype(float)
+    numbers = numbers.mask(negative, -numbers)
     
-    # แปลงตัวเลขปกติ
-    try:
-        return float(s_val)
-    except:
-        return value
+    result = numbers.astype(object)
+    unparsed = numbers.isna() & ~blank
+    result[unparsed] = series[unparsed]
+    result[blank] = None
+    return result
+
+def detect_separator(line):
+    """เดาตัวคั่นจากบรรทัด Header (SAP export ส่วนใหญ่ใช้ Tab)"""
+    return '\t' if '\t' in line and line.count('\t') >= line.count(',') else ','
+
+HEADER_KEYWORDS = ('รายละเอียด', 'Account', 'Description')
 
 def find_csv_header_row(file_path, encoding):
-    """หาบรรทัด Header ของ CSV"""
+    """หาบรรทัด Header ของ CSV คืนค่า (เลขบรรทัด, ตัวคั่นที่เดาจากบรรทัดนั้น)"""
+    # SAP Report มักขึ้นต้นด้วย 'รายละเอียด' หรือ 'Account'
+    # ค้นหาเป็น bytes (encode keyword ตาม encoding ของไฟล์) บน mmap ทั้งไฟล์ -> ไม่ต้อง decode ทีละบรรทัด
+    needles = []
+    for keyword in HEADER_KEYWORDS:
+        try:
+            needles.append(keyword.encode(encoding))
+        except UnicodeEncodeError:
+            pass # encoding นี้ไม่มีตัวอักษรของ keyword = ไม่มีทางเจอในไฟล์อยู่แล้ว
+    
     try:
-        with open(file_path, 'r', encoding=encoding, errors='ignore') as f:
-            for i, line in enumerate(f):
-                # SAP Report มักขึ้นต้นด้วย 'รายละเอียด' หรือ 'Account'
-                if 'รายละเอียด' in line or 'Account' in line or 'Description' in line:
-                    return i
-    except:
-        pass
-    return 0 # Default
+        with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # Header ของ SAP export อยู่ช่วงต้นไฟล์ ค้นหาแค่ช่วงแรกก่อน ไม่เจอค่อยขยายช่วงต่อทีละเท่า
+            # (keyword ที่ไม่มีในไฟล์ เช่น 'Description' ใน export ภาษาไทย จะได้ไม่ต้องไล่ทั้งไฟล์ทุกครั้ง)
+            # ค้นหาเฉพาะตำแหน่งเริ่มที่ยังไม่เคยค้น และเผื่อ keyword ที่คร่อมขอบช่วงให้เจอในรอบนี้
+            start, limit = 0, HEADER_SCAN_BYTES
+            positions = []
+            while not positions and start < len(mm):
+                positions = [pos for pos in (mm.find(needle, start, limit + len(needle) - 1) for needle in needles)
+                             if pos != -1]
+                start, limit = limit, limit * 2
+            if positions:
+                match = min(positions)
+                line_start = max(mm.rfind(b'\n', 0, match), mm.rfind(b'\r', 0, match)) + 1
+                line_end = mm.find(b'\n', match)
+                
+                # นับบรรทัดแบบ universal newline (\r\n, \n, \r) ให้ตรงกับการอ่านไฟล์แบบ text
+                prefix = mm[:line_start]
+                row = prefix.count(b'\n') + prefix.count(b'\r') - prefix.count(b'\r\n')
+                line = mm[line_start:line_end if line_end != -1 else len(mm)].decode(encoding, errors='ignore')
+                return row, detect_separator(line)
+    except (OSError, ValueError):
+        pass # เปิดไฟล์ไม่ได้ หรือไฟล์ว่าง (mmap ไฟล์ขนาด 0 ไม่ได้)
+    return 0, '\t' # Default
 
 def read_csv_file(file_path, encoding):
     print(f"  📄 Reading: {os.path.basename(file_path)}")
     
-    header_row = find_csv_header_row(file_path, encoding)
+    header_row, sep = find_csv_header_row(file_path, encoding)
     print(f"     > Found header at row: {header_row + 1}")
     
+    def read_with(sep):
+        # อ่านแค่ Header ก่อนเพื่อนับคอลัมน์ แล้วให้คอลัมน์ตัวเลขอ่านเป็น str ไปเลย
+        # (clean_sap_column แปลงเองอยู่แล้ว) ไม่ต้องให้ pandas เดาชนิดข้อมูลทั้งคอลัมน์ก่อนหนึ่งรอบ
+        columns = pd.read_csv(file_path, sep=sep, encoding=encoding, header=header_row, nrows=0).columns
+        dtype = {idx: str for idx in range(1, len(columns))}
+        return pd.read_csv(file_path, sep=sep, encoding=encoding, header=header_row, on_bad_lines='skip', dtype=dtype)
+
+    # อ่านด้วยตัวคั่นที่เดาจากบรรทัด Header ก่อน (ไฟล์ Comma ไม่ต้อง parse แบบ Tab ทิ้งไปหนึ่งรอบ)
+    # ถ้าได้คอลัมน์เดียวหรืออ่านไม่ได้ ค่อยลองอีกตัวคั่นหนึ่ง
+    other_sep = ',' if sep == '\t' else '\t'
     try:
-        # ลองอ่านด้วย Tab (\t)
-        df = pd.read_csv(file_path, sep='\t', encoding=encoding, header=header_row, on_bad_lines='skip')
+        df = read_with(sep)
         if len(df.columns) <= 1:
-             # ถ้าไม่เวิร์ค ลอง Comma
-             df = pd.read_csv(file_path, sep=',', encoding=encoding, header=header_row, on_bad_lines='skip')
-    except:
-        df = pd.read_csv(file_path, sep=',', encoding=encoding, header=header_row, on_bad_lines='skip')
-
-    # ลบคอลัมน์ขยะ
-    df = df.loc[:, ~df.columns.str.contains('^Unnamed')]
-    df.columns = df.columns.str.strip() # ลบช่องว่างชื่อหัวตาราง
+             df = read_with(other_sep)
+    except (pd.errors.ParserError, pd.errors.EmptyDataError, UnicodeDecodeError):
+        df = read_with(other_sep)
+
+    # ลบคอลัมน์ขยะ (ไม่ต้องใช้ regex และไม่ต้อง slice สร้าง DataFrame ใหม่)
+    unnamed_cols = [col for col in df.columns if str(col).startswith('Unnamed')]
+    if unnamed_cols:
+        df.drop(columns=unnamed_cols, inplace=True)
+    df.columns = [col.strip() for col in df.columns] # ลบช่องว่างชื่อหัวตาราง
     
-    # Clean Data (แปลงตัวเลข)
+    # Clean Data (แปลงตัวเลขทั้งคอลัมน์)
     for col in df.columns:
         if col != df.columns[0]: # เว้นคอลัมน์แรก (ชื่อรายการ)
-            df[col] = df[col].apply(clean_sap_value)
+            df[col] = clean_sap_column(df[col])
             
     print(f"     > Data Loaded: {len(df)} rows, {len(df.columns)} columns")
     return df
 
-def apply_style(cell, template_cell, is_number=True):
-    """ฟังก์ชันก๊อปปี้ Style จากเซลล์ต้นแบบ"""
-    if template_cell and template_cell.has_style:
-        cell.font = copy(template_cell.font)
-        cell.border = copy(template_cell.border)
-        cell.fill = copy(template_cell.fill)
-        cell.alignment = copy(template_cell.alignment)
-        
-        # ถ้าเป็นตัวเลข ให้ใช้ Format บัญชีเสมอ (ไม่ก๊อปปี้ format เดิม)
-        if is_number:
-            cell.number_format = '_(* #,##0.00_);_(* (#,##0.00);_(* "-"??_);_(@_)'
-        else:
-            cell.number_format = copy(template_cell.number_format)
+# Style ที่ต้องก๊อปปี้จากเซลล์ต้นแบบ (ใช้เมื่อ openpyxl ไม่มี cell._style ให้ก๊อปปี้ทั้งชุด)
+STYLE_ATTRIBUTES = ('font', 'border', 'fill', 'alignment', 'protection', 'number_format')
+
+# prepare_style/apply_style เป็นที่เดียวที่แตะ cell._style (StyleArray ของ openpyxl 3.1.x)
+# ก๊อปปี้ StyleArray ครั้งเดียวแทนการตั้ง font/border/fill/alignment/number_format ทีละ attribute
+# ถ้า openpyxl รุ่นอื่นไม่มี _style จะถอยไปก๊อปปี้ทีละ attribute ผ่าน API ปกติ
+def prepare_style(template_cell, is_number=True):
+    """เตรียม Style ต้นแบบครั้งเดียวต่อชีต คืนค่า StyleArray (None ถ้าเซลล์ต้นแบบไม่มี Style)"""
+    if not (template_cell and template_cell.has_style):
+        return None
+    
+    # ถ้าเป็นตัวเลข ให้ใช้ Format บัญชีเสมอ (ไม่ใช้ format เดิมของต้นแบบ)
+    if is_number:
+        template_cell.number_format = ACCOUNTING_NUMBER_FORMAT
+    if hasattr(template_cell, '_style'):
+        return copy(template_cell._style)
+    return {attr: copy(getattr(template_cell, attr)) for attr in STYLE_ATTRIBUTES}
+
+def apply_style(cell, style):
+    """ก๊อปปี้ Style ที่เตรียมไว้ลงเซลล์ (font/border/fill/alignment/number_format ในครั้งเดียว)"""
+    if style is None:
+        return
+    if isinstance(style, dict):
+        for attr, value in style.items():
+            setattr(cell, attr, copy(value))
+    else:
+        cell._style = copy(style)
 
 def write_and_format(ws, df):
     """เขียนข้อมูลเรียงตาม CSV และ Clone Style"""
@@ -128,11 +188,12 @@ def write_and_format(ws, df):
     
     # 1. จำ Style ต้นแบบ (จากแถวข้อมูลแถวแรกของ Template)
     # เราจะใช้คอลัมน์ 1 เป็นต้นแบบ Text และคอลัมน์ 2 เป็นต้นแบบ Number
-    style_template_text = ws.cell(row=DATA_START_ROW, column=1)
-    style_template_num = ws.cell(row=DATA_START_ROW, column=2)
+    # เตรียม Style ไว้ครั้งเดียว แล้วก๊อปปี้ทั้งชุดลงแต่ละเซลล์ (ไม่ต้อง copy ทีละ attribute ทุกเซลล์)
+    style_template_text = prepare_style(ws.cell(row=DATA_START_ROW, column=1), is_number=False)
+    style_template_num = prepare_style(ws.cell(row=DATA_START_ROW, column=2), is_number=True)
     
     # จำ Style หัวตารางด้วย (จากคอลัมน์ 2 แถว 5)
-    style_header_num = ws.cell(row=EXCEL_HEADER_ROW, column=2)
+    style_header_num = prepare_style(ws.cell(row=EXCEL_HEADER_ROW, column=2), is_number=False)
 
     # 2. ลบข้อมูลเก่าทิ้ง (Clear Data) แต่เก็บ Header ไว้
     # ลบตั้งแต่แถวข้อมูลลงไปจนสุด และลบคอลัมน์ขวาทิ้งทั้งหมดเพื่อเขียนใหม่
@@ -140,31 +201,37 @@ def write_and_format(ws, df):
     
     # 3. เขียน Header ใหม่ (ตาม CSV)
     for col_idx, col_name in enumerate(df.columns, start=1):
-        cell = ws.cell(row=EXCEL_HEADER_ROW, column=col_idx)
-        cell.value = col_name
+        cell = ws.cell(row=EXCEL_HEADER_ROW, column=col_idx, value=col_name)
         
         # จัด Format Header (ถ้าคอลัมน์เกิน Template เดิม ให้ก๊อปจากต้นแบบ)
         if col_idx > 1:
-            apply_style(cell, style_header_num, is_number=False)
-            
-        # ปรับความกว้างคอลัมน์ (ถ้าเป็นคอลัมน์ใหม่)
+            apply_style(cell, style_header_num)
+
+    # ปรับความกว้างคอลัมน์ (ถ้าเป็นคอลัมน์ใหม่) ครั้งเดียวหลังเขียน Header
+    # เช็ค key ก่อน ไม่ให้ column_dimensions สร้าง ColumnDimension เปล่าๆ (width 13) ให้เอง
+    existing = ws.column_dimensions
+    for col_idx in range(1, len(df.columns) + 1):
         col_letter = get_column_letter(col_idx)
-        if not ws.column_dimensions[col_letter].width:
-             ws.column_dimensions[col_letter].width = 15 # default width
-
-    # 4. เขียนข้อมูล (Data)
-    for r_idx, row in enumerate(df.values, start=DATA_START_ROW):
-        for c_idx, value in enumerate(row, start=1):
-            cell = ws.cell(row=r_idx, column=c_idx)
-            cell.value = value
-            
-            # 5. ใส่ Style
-            if c_idx == 1:
-                # คอลัมน์แรก (Text/Description)
-                apply_style(cell, style_template_text, is_number=False)
-            else:
-                # คอลัมน์อื่นๆ (ตัวเลข)
-                apply_style(cell, style_template_num, is_number=True)
+        if col_letter not in existing or not existing[col_letter].width:
+            existing[col_letter] = ColumnDimension(ws, index=col_letter, width=15) # default width
+
+    # 4. เขียนข้อมูล (Data) พร้อม 5. ใส่ Style
+    # เลือก Style ของแต่ละคอลัมน์ไว้ก่อนวนลูป: คอลัมน์แรก (Text/Description), คอลัมน์อื่นๆ (ตัวเลข)
+    column_styles = [style_template_text] + [style_template_num] * (len(df.columns) - 1)
+    # itertuples ได้ tuple ของค่า Python ทีละแถว ไม่ต้องแปลงทั้ง DataFrame เป็น object array แบบ df.values
+    # ws.append สร้างเซลล์ทั้งแถวในครั้งเดียว (ไม่ต้องค้นพิกัดทีละเซลล์แบบ ws.cell)
+    # delete_rows ด้านบนทำให้แถวสุดท้ายของชีตคือแถว Header แล้ว append จึงเริ่มที่ DATA_START_ROW พอดี
+    for row in df.itertuples(index=False, name=None):
+        ws.append(row)
+
+    # ใส่ Style ทีละคอลัมน์ (ทั้งคอลัมน์ใช้ Style เดียวกัน)
+    last_row = DATA_START_ROW + len(df) - 1
+    for c_idx, style in enumerate(column_styles, start=1):
+        if style is None or last_row < DATA_START_ROW:
+            continue
+        for column in ws.iter_cols(min_row=DATA_START_ROW, max_row=last_row, min_col=c_idx, max_col=c_idx):
+            for cell in column:
+                apply_style(cell, style)
 
     print(f"     > Success! Wrote {len(df)} rows.")
 
@@ -180,48 +247,69 @@ def main(csv_dir, template_path, output_path):
         print(f"❌ Error loading template: {e}")
         return
 
-    import glob
+    # 1. หาไฟล์ CSV ของแต่ละ mapping ก่อน
+    # อ่านรายชื่อไฟล์ในโฟลเดอร์ครั้งเดียว แล้วจับคู่ prefix ในหน่วยความจำ (ไม่ต้อง glob ทีละ mapping)
+    # prefix ไม่รวมเดือน (_1025) เพื่อให้ใช้กับไฟล์เดือนอื่นได้ จึงใช้ startswith แทนการจัดกลุ่มด้วยชื่อตรงๆ
+    with os.scandir(csv_dir) as it:
+        csv_entries = [(entry.name, entry.path) for entry in it
+                       if entry.name.endswith('.csv') and not entry.name.startswith('.')]
+
+    jobs = []
     for mapping in CSV_MAPPING:
-        print("-" * 40)
-        
-        # Use glob to find the file that matches the pattern
-        file_pattern = mapping['file'].split('_1025')[0] + '*.csv'
-        found_files = glob.glob(os.path.join(csv_dir, file_pattern))
+        file_prefix = mapping['file'].split('_1025')[0]
+        found_files = [path for name, path in csv_entries if name.startswith(file_prefix)]
         
         if not found_files:
-            print(f"⚠️  Skipping: Pattern '{file_pattern}' not found.")
+            print(f"⚠️  Skipping: Pattern '{file_prefix}*.csv' not found.")
             continue
             
         csv_path = found_files[0] # Use the first file found
-        sheet_name = mapping['sheet']
 
         if not os.path.exists(csv_path):
             print(f"⚠️  Skipping: {os.path.basename(csv_path)} (Not Found)")
             continue
+        
+        jobs.append((mapping, csv_path))
 
-        # อ่าน CSV
-        try:
-            df = read_csv_file(csv_path, mapping['encoding'])
-        except Exception as e:
-            print(f"❌ Error reading CSV: {e}")
-            continue
+    if not jobs:
+        print("⚠️  No CSV files to convert.")
+    else:
+        # 2. อ่าน + Clean CSV ทุกไฟล์พร้อมกันหลาย process (แต่ละไฟล์ไม่ขึ้นต่อกัน)
+        #    แล้วเขียนลง Excel ตามลำดับ CSV_MAPPING ใน process หลัก (openpyxl workbook แชร์ข้าม process ไม่ได้)
+        max_workers = min(len(jobs), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(read_csv_file, csv_path, mapping['encoding'])
+                for mapping, csv_path in jobs
+            ]
+            
+            for (mapping, csv_path), future in zip(jobs, futures):
+                print("-" * 40)
+                sheet_name = mapping['sheet']
+
+                # อ่าน CSV
+                try:
+                    df = future.result()
+                except Exception as e:
+                    print(f"❌ Error reading CSV: {e}")
+                    continue
 
-        # เขียนลง Excel
-        if sheet_name in wb.sheetnames:
-            ws = wb[sheet_name]
-            try:
-                write_and_format(ws, df)
-            except Exception as e:
-                print(f"❌ Error writing: {e}")
-                import traceback
-                traceback.print_exc()
-        else:
-            print(f"⚠️  Sheet '{sheet_name}' not found. Creating new.")
-            ws = wb.create_sheet(sheet_name)
-            # เขียนแบบไม่มี Style อ้างอิง (เพราะไม่มี Template Sheet นี้)
-            from openpyxl.utils.dataframe import dataframe_to_rows
-            for r in dataframe_to_rows(df, index=False, header=True):
-                ws.append(r)
+                # เขียนลง Excel
+                if sheet_name in wb.sheetnames:
+                    ws = wb[sheet_name]
+                    try:
+                        write_and_format(ws, df)
+                    except Exception as e:
+                        print(f"❌ Error writing: {e}")
+                        import traceback
+                        traceback.print_exc()
+                else:
+                    print(f"⚠️  Sheet '{sheet_name}' not found. Creating new.")
+                    ws = wb.create_sheet(sheet_name)
+                    # เขียนแบบไม่มี Style อ้างอิง (เพราะไม่มี Template Sheet นี้)
+                    from openpyxl.utils.dataframe import dataframe_to_rows
+                    for r in dataframe_to_rows(df, index=False, header=True):
+                        ws.append(r)
 
     print("="*60)
     print(f"💾 Saving to: {output_path}")
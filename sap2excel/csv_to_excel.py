@@ -5,13 +5,32 @@ CSV to Excel Converter with Formatting
 """
 
 import pandas as pd
+import numpy as np
 import openpyxl
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.dimensions import ColumnDimension
+from openpyxl.cell import WriteOnlyCell
 import os
+from concurrent.futures import ProcessPoolExecutor
+from copy import copy
 from datetime import datetime
 import re
 
+# รูปแบบบัญชี: เลขลบแสดงเป็น (xxx.xx) สีแดง
+ACCOUNTING_NUMBER_FORMAT = '#,##0.00_);[Red](#,##0.00)'
+
+# วันเวลาที่พิมพ์ในหัวรายงาน SAP (เช่น 10-11-2025 14:30)
+DATE_PRINTED_PATTERN = re.compile(r'\d{2}-\d{2}-\d{4}\s+\d{2}:\d{2}')
+# งวดในชื่อไฟล์ CSV (เช่น "1025" จาก "001_ต้นทุน_BU_1025 - 10-11-68.csv")
+PERIOD_PATTERN = re.compile(r'_(\d{4})\s*-')
+# ค่าที่ pandas ถือเป็นค่าว่าง (NA) โดย default ตอนอ่าน CSV
+# อ่าน CSV แบบปิด NA filter แล้ว จึงต้องแปลงค่าเหล่านี้ในคอลัมน์ตัวเลขกลับเป็น NaN เอง
+CSV_NA_VALUES = frozenset({
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+})
+
 
 class CSVToExcelConverter:
     """แปลงไฟล์ CSV เป็น Excel พร้อมจัดรูปแบบ"""
@@ -32,6 +51,9 @@ class CSVToExcelConverter:
         # Styles
         self.font_header = Font(name='TH Sarabun New', size=18, bold=True)
         self.font_data = Font(name='TH Sarabun New', size=16)
+        self.font_data_bold = Font(name='TH Sarabun New', size=16, bold=True)
+        self.font_data_negative = Font(name='TH Sarabun New', size=16, color='FF0000')
+        self.font_subheader = Font(name='TH Sarabun New', size=14, bold=True)
         self.fill_header = PatternFill(start_color='FFF4DEDC', end_color='FFF4DEDC', fill_type='solid')
         self.alignment_center = Alignment(horizontal='center', vertical='center', wrap_text=True)
         self.alignment_vcenter = Alignment(vertical='center')
@@ -48,6 +70,15 @@ class CSVToExcelConverter:
             'อื่นไม่ใช่โทรคมนาคม': 'FFBDD7EE',
             'รายได้อื่น/ค่าใช้จ่ายอื่น': 'FFEAC1C0',
         }
+        # ลำดับการจับคู่ (key, สี) เป็น tuple ตายตัว และผลลัพธ์ของแต่ละชื่อ BU ที่เคยหาแล้ว
+        # (ชื่อ BU ชุดเดียวกันซ้ำทุก sheet จึงไล่หา key แค่ครั้งแรก)
+        self._bu_match = tuple(self.bu_colors.items())
+        self.bu_color_cache = {}
+        # สร้าง Fill ของแต่ละสี BU ไว้ครั้งเดียว (รวมสีเริ่มต้น) ไม่ต้องสร้างใหม่ทุกเซลล์
+        # และตรวจรูปแบบสีทั้งหมดตั้งแต่ตอนสร้าง converter
+        self.bu_fills = {}
+        for color in set(self.bu_colors.values()) | {'FFF4DEDC'}:
+            self._get_fill(color)
 
         # สีสำหรับ Row Headers (รายละเอียด)
         self.fill_description = PatternFill(start_color='FFF4DEDC', end_color='FFF4DEDC', fill_type='solid')
@@ -65,36 +96,40 @@ class CSVToExcelConverter:
 
     def find_csv_files(self, period):
         """ค้นหาไฟล์ CSV ตาม period (เช่น 1025)"""
-        csv_files = {}
-
-        for file_prefix, sheet_name in self.file_mapping.items():
-            # ค้นหาไฟล์ที่ตรงกับ pattern
-            pattern = f"{file_prefix}_{period}"
-
-            for filename in os.listdir(self.base_path):
-                if filename.startswith(pattern) and filename.endswith('.csv'):
-                    csv_files[sheet_name] = os.path.join(self.base_path, filename)
-                    break
-
-        return csv_files
+        found = {}
+        # pattern ของแต่ละ sheet (เช่น 001_ต้นทุน_BU_1025)
+        patterns = {f"{file_prefix}_{period}": sheet_name for file_prefix, sheet_name in self.file_mapping.items()}
+
+        # อ่านรายชื่อไฟล์ในโฟลเดอร์ครั้งเดียว แล้วจับคู่กับทุก pattern (ไม่ต้อง listdir ทีละ sheet)
+        with os.scandir(self.base_path) as it:
+            for entry in it:
+                if not entry.name.endswith('.csv'):
+                    continue
+                for pattern, sheet_name in patterns.items():
+                    if entry.name.startswith(pattern) and sheet_name not in found:
+                        found[sheet_name] = os.path.join(self.base_path, entry.name)
+                        break
+
+        # คืนค่าเรียงตามลำดับ sheet ใน file_mapping (ลำดับ sheet ใน Excel)
+        return {sheet_name: found[sheet_name] for sheet_name in self.file_mapping.values() if sheet_name in found}
 
     def read_csv_data(self, csv_path):
         """อ่านไฟล์ CSV และแยกส่วนต่างๆ"""
         # อ่านไฟล์ CSV ด้วย encoding cp874 (Thai Windows) และ tab delimiter
-        df = pd.read_csv(csv_path, encoding='cp874', sep='\t')
+        # อ่านครั้งเดียวทั้งไฟล์เป็น str ไม่ต้องให้ pandas เดาชนิดข้อมูล (ตัวเลขแปลงเองด้านล่าง)
+        # ใช้ C engine และปิด NA filter: ช่องว่างได้เป็น '' ตรงๆ ไม่ต้องเช็ค NaN อีก
+        df = pd.read_csv(csv_path, encoding='cp874', sep='\t',
+                         engine='c', dtype=str, na_filter=False, keep_default_na=False)
 
         # ดึงข้อมูลจาก header
         report_title_raw = df.iloc[0, 0] if len(df) > 0 else "รายงานผลการดำเนินงาน"
         # แยกชื่อรายงาน (มักจะมี tab characters ต่อท้าย)
-        if isinstance(report_title_raw, str):
-            report_title = report_title_raw.split('\t')[0].strip()
-        else:
-            report_title = "รายงานผลการดำเนินงาน"
+        report_title = report_title_raw.split('\t')[0].strip() or "รายงานผลการดำเนินงาน"
 
         date_printed = df.iloc[1, 0] if len(df) > 1 else ""
 
         # แยกวันที่ออกมา
-        date_match = re.search(r'\d{2}-\d{2}-\d{4}\s+\d{2}:\d{2}', str(date_printed))
+        date_match = DATE_PRINTED_PATTERN.search(str(date_printed))
         if date_match:
             date_str = date_match.group()
         else:
@@ -113,18 +148,20 @@ class CSVToExcelConverter:
         # ตรวจสอบว่าเป็น Product sheet หรือไม่
         has_product_headers = False
         if len(df) > 5:
-            # ถ้า row 5 มีข้อมูลที่ไม่ใช่ NaN แสดงว่าเป็น Product sheet
+            # ถ้า row 5 มีข้อมูลที่ไม่ว่าง แสดงว่าเป็น Product sheet
             row5_values = df.iloc[5].tolist()
-            if any(pd.notna(v) and str(v).strip() != '' for v in row5_values):
+            if any(v.strip() != '' for v in row5_values):
                 has_product_headers = True
 
-        # แก้ไขตัวเลขที่มีเครื่องหมายลบต่อท้าย เช่น "419523515.74-" เป็น "-419523515.74"
+        # แยกส่วนข้อมูล (Row 7+) จาก DataFrame เดียวกัน
+        # (ไม่อ่านไฟล์ซ้ำด้วย skiprows เพราะ skiprows นับบรรทัดจริงรวมบรรทัดว่าง แต่ pandas ข้ามบรรทัดว่างไปแล้ว
+        # ถ้าส่วนหัวมีบรรทัดว่าง ข้อมูลจะเลื่อนไปหนึ่งแถว)
         data_df = df.iloc[7:].reset_index(drop=True) if len(df) > 7 else pd.DataFrame()
 
-        # แปลงตัวเลขที่มี - ต่อท้ายให้เป็นเลขลบปกติ
-        for col in data_df.columns:
-            if col != 0:  # ไม่ต้องแปลง column แรก (รายละเอียด)
-                data_df[col] = data_df[col].apply(self._fix_negative_number)
+        # แก้ไขตัวเลขที่มีเครื่องหมายลบต่อท้าย เช่น "419523515.74-" เป็น "-419523515.74"
+        # แปลงตัวเลขที่มี - ต่อท้ายให้เป็นเลขลบปกติ (ทั้งคอลัมน์ทีเดียว)
+        for col in data_df.columns[1:]:  # ไม่ต้องแปลง column แรก (รายละเอียด)
+            data_df[col] = self._fix_negative_column(data_df[col])
 
         result = {
             'report_title': report_title,
@@ -133,7 +170,6 @@ class CSVToExcelConverter:
             'sub_headers': df.iloc[4].tolist() if len(df) > 4 else [],
             'has_product_headers': has_product_headers,
             'data_df': data_df,
-            'full_df': df
         }
 
         # เพิ่ม Product headers ถ้ามี
@@ -143,34 +179,24 @@ class CSVToExcelConverter:
 
         return result
 
-    def _fix_negative_number(self, value):
-        """แปลงเลขที่มีเครื่องหมายลบต่อท้าย เช่น '419523515.74-' เป็น -419523515.74
-        และแปลง string ตัวเลขเป็น float
+    def _fix_negative_column(self, series):
+        """แปลงคอลัมน์ตัวเลขจาก SAP ทั้งคอลัมน์ทีเดียว (vectorized)
+        - ตัวเลข SAP ('1,234.00-') -> float (-1234.00)
+        - string ที่แปลงเป็นตัวเลขไม่ได้ (รวมช่องที่มีแต่ช่องว่าง) -> string เดิมที่ตัดช่องว่างแล้ว
+        - ค่าว่าง ('' หรือ NaN) และค่า NA ของ pandas ('nan', 'N/A', 'NULL', ...) -> NaN
         """
-        if isinstance(value, str):
-            value = value.strip()
-
-            # ถ้าเป็น string ว่างหรือไม่ใช่ตัวเลข ให้คืนค่าเดิม
-            if value == '' or value == 'nan':
-                return value
-
-            # ตรวจสอบว่ามีเครื่องหมาย - ต่อท้ายหรือไม่
-            if value.endswith('-'):
-                # ลบเครื่องหมาย - และแปลงเป็นตัวเลข
-                try:
-                    num = float(value[:-1].replace(',', ''))
-                    return -num
-                except:
-                    return value
-            else:
-                # พยายามแปลงเป็นตัวเลข
-                try:
-                    num = float(value.replace(',', ''))
-                    return num
-                except:
-                    return value
+        text = series.astype(str).str.strip()
 
-        return value
+        # จัดการเครื่องหมายลบข้างหลัง
+        negative = text.str.endswith('-')
+        core = text.mask(negative, text.str[:-1]).str.replace(',', '', regex=False)
+        numbers = pd.to_numeric(core, errors='coerce').astype(float)
+        numbers = numbers.mask(negative, -numbers)
+
+        result = numbers.astype(object)
+        unparsed = numbers.isna() & series.notna() & ~series.isin(CSV_NA_VALUES)
+        result[unparsed] = text[unparsed]
+        return result
 
     def get_period_text(self, period):
         """แปลง period (เช่น 1025) เป็น text (เช่น 10 เดือน สิ้นสุดวันที่ 31 ตุลาคม 2568)
@@ -208,258 +234,287 @@ class CSVToExcelConverter:
         return "สำหรับงวด..."
 
     def create_formatted_sheet(self, ws, sheet_data, period):
-        """สร้างและจัดรูปแบบ sheet"""
+        """สร้างและจัดรูปแบบ sheet
+
+        ws เป็น write-only worksheet: ต้องเขียนทีละแถวจากบนลงล่างด้วย ws.append
+        และกำหนดความกว้าง/ความสูงให้เสร็จก่อนเขียนแถวแรก
+        """
+        # กำหนด start_row ตามประเภท sheet
+        has_product_headers = sheet_data.get('has_product_headers', False)
+        if has_product_headers:
+            start_row = 11  # ถ้ามี Product headers ให้เริ่มที่แถว 11
+        else:
+            start_row = 10  # ถ้าไม่มีให้เริ่มที่แถว 10
+
+        # ปรับความกว้างของคอลัมน์
+        ws.column_dimensions['B'].width = 65
+        # Columns C - AW กว้างเท่ากัน ใช้ ColumnDimension เดียวครอบทั้งช่วง (เขียนเป็น <col min="3" max="49">)
+        ws.column_dimensions['C'] = ColumnDimension(ws, index='C', min=3, max=49, width=15)
+
+        # ปรับความสูงของแถว
+        ws.row_dimensions[2].height = 21.65
+        ws.row_dimensions[3].height = 21.65
+        ws.row_dimensions[4].height = 21.65
+        ws.row_dimensions[6].height = 14.15
+        ws.row_dimensions[9].height = 54.0
 
         # บรรทัดที่ 1: ว่าง
-        # บรรทัดที่ 2: ชื่อบริษัท
-        ws['B2'] = 'บริษัท โทรคมนาคมแห่งชาติ จำกัด (มหาชน)'
-        ws['B2'].font = self.font_header
-        ws['B2'].alignment = self.alignment_vcenter
-        # Merge cells สำหรับ header (แนวนอน)
-        ws.merge_cells('B2:E2')
+        ws.append([])
 
+        # บรรทัดที่ 2: ชื่อบริษัท
         # บรรทัดที่ 3: ชื่อรายงาน
-        report_title = sheet_data['report_title']
-        ws['B3'] = report_title
-        ws['B3'].font = self.font_header
-        ws['B3'].alignment = self.alignment_vcenter
-        # Merge cells สำหรับ report title (แนวนอน)
-        ws.merge_cells('B3:E3')
-
         # บรรทัดที่ 4: งวดเวลา
         period_text = self.get_period_text(period)
-        ws['B4'] = period_text
-        ws['B4'].font = self.font_header
-        ws['B4'].alignment = self.alignment_vcenter
-        # Merge cells สำหรับ period (แนวนอน)
-        ws.merge_cells('B4:E4')
+        for excel_row, text in enumerate(['บริษัท โทรคมนาคมแห่งชาติ จำกัด (มหาชน)',
+                                          sheet_data['report_title'],
+                                          period_text], start=2):
+            cell = WriteOnlyCell(ws, value=text)
+            cell.font = self.font_header
+            cell.alignment = self.alignment_vcenter
+            ws.append([None, cell])
+            # Merge cells สำหรับ header (แนวนอน)
+            ws.merged_cells.add(f'B{excel_row}:E{excel_row}')
 
         # บรรทัดที่ 5: ว่าง
+        ws.append([])
 
         # บรรทัดที่ 6: Business Unit Headers
         bu_color_map = {}  # เก็บ mapping ระหว่าง column กับสี BU
         bu_headers = sheet_data['bu_headers']
+        row_cells = [None] * (len(bu_headers) + 1)
         if bu_headers:
             # ค้นหา BU headers ที่ไม่ซ้ำและตำแหน่งที่ต้อง merge
-            bu_merge_ranges = []
-            current_bu = None
-            start_col = None
-
-            for col_idx, header in enumerate(bu_headers, start=2):
-                header_str = str(header).strip() if pd.notna(header) else ''
-
-                # ถ้าเจอ header ใหม่ที่ไม่ว่าง
-                if header_str != '' and header_str != 'nan':
-                    # ถ้ามี BU ก่อนหน้า ให้บันทึก merge range
-                    if current_bu is not None and start_col is not None:
-                        bu_merge_ranges.append((start_col, col_idx - 1, current_bu))
-
-                    # เริ่ม BU ใหม่
-                    current_bu = header_str
-                    start_col = col_idx
-                else:
-                    # ถ้าเป็นคอลัมน์ว่าง และมี current_bu อยู่ แสดงว่ายังอยู่ในช่วงเดียวกัน
-                    pass
-
-            # บันทึก BU สุดท้าย
-            if current_bu is not None and start_col is not None:
-                bu_merge_ranges.append((start_col, len(bu_headers) + 1, current_bu))
+            bu_merge_ranges = self._compute_merge_ranges(bu_headers)
 
             # วาง BU headers และ merge cells พร้อมบันทึก mapping สี
             for start_col, end_col, bu_name in bu_merge_ranges:
                 # หาสีสำหรับ BU นี้
                 bu_color = self._get_bu_color(bu_name)
-                bu_fill = PatternFill(start_color=bu_color, end_color=bu_color, fill_type='solid')
+                bu_fill = self._get_fill(bu_color)
 
                 # บันทึก mapping ของสีสำหรับ columns ในช่วงนี้
                 for col in range(start_col, end_col + 1):
                     bu_color_map[col] = bu_color
 
                 # วางค่าในเซลล์แรก
-                cell = ws.cell(row=6, column=start_col, value=bu_name)
+                cell = WriteOnlyCell(ws, value=bu_name)
                 cell.font = self.font_header
                 cell.fill = bu_fill
                 cell.alignment = self.alignment_center
                 cell.border = self.border_thin
+                row_cells[start_col - 1] = cell
 
                 # Merge cells ถ้ามีมากกว่า 1 คอลัมน์
                 if end_col > start_col:
                     start_letter = get_column_letter(start_col)
                     end_letter = get_column_letter(end_col)
-                    ws.merge_cells(f'{start_letter}6:{end_letter}6')
+                    ws.merged_cells.add(f'{start_letter}6:{end_letter}6')
 
-                    # ใส่ border และสีให้กับเซลล์ที่ merge ด้วย
-                    for col in range(start_col, end_col + 1):
-                        ws.cell(row=6, column=col).border = self.border_thin
-                        ws.cell(row=6, column=col).fill = bu_fill
+                    # เซลล์ที่ถูก merge ใส่แค่ border (Excel วาดกรอบของช่วง merge จาก border ของทุกเซลล์
+                    # แต่สีพื้นใช้จากเซลล์แรกเท่านั้น จึงไม่ต้องใส่ fill ซ้ำ)
+                    for col in range(start_col + 1, end_col + 1):
+                        merged_cell = WriteOnlyCell(ws)
+                        merged_cell.border = self.border_thin
+                        row_cells[col - 1] = merged_cell
+        ws.append(row_cells)
 
         # บรรทัดที่ 7: ว่าง
+        ws.append([])
 
         # บรรทัดที่ 8: Sub Headers (Product Group - ใช้สีตาม BU และ merge cells)
         sub_headers = sheet_data['sub_headers']
+        row_cells = [None] * (len(sub_headers) + 1)
         if sub_headers:
             # หา Sub header ranges ที่ต้อง merge (เหมือนกับ BU headers)
-            sub_merge_ranges = []
-            current_sub = None
-            start_col = None
-
-            for col_idx, header in enumerate(sub_headers, start=2):
-                header_str = str(header).strip() if pd.notna(header) else ''
-
-                # ถ้าเจอ header ใหม่ที่ไม่ว่าง
-                if header_str != '' and header_str != 'nan':
-                    # ถ้ามี sub header ก่อนหน้า ให้บันทึก merge range
-                    if current_sub is not None and start_col is not None:
-                        sub_merge_ranges.append((start_col, col_idx - 1, current_sub))
-
-                    # เริ่ม sub header ใหม่
-                    current_sub = header_str
-                    start_col = col_idx
-                else:
-                    # ถ้าเป็นคอลัมน์ว่าง และมี current_sub อยู่ แสดงว่ายังอยู่ในช่วงเดียวกัน
-                    pass
-
-            # บันทึก sub header สุดท้าย
-            if current_sub is not None and start_col is not None:
-                sub_merge_ranges.append((start_col, len(sub_headers) + 1, current_sub))
+            sub_merge_ranges = self._compute_merge_ranges(sub_headers)
 
             # วาง Sub headers และ merge cells
             for start_col, end_col, sub_name in sub_merge_ranges:
                 # หาสีจาก BU color map
                 sub_color = bu_color_map.get(start_col, 'FFF4DEDC')
-                sub_fill = PatternFill(start_color=sub_color, end_color=sub_color, fill_type='solid')
+                sub_fill = self._get_fill(sub_color)
 
                 # วางค่าในเซลล์แรก
-                cell = ws.cell(row=8, column=start_col, value=sub_name)
-                cell.font = Font(name='TH Sarabun New', size=14, bold=True)
+                cell = WriteOnlyCell(ws, value=sub_name)
+                cell.font = self.font_subheader
                 cell.fill = sub_fill
                 cell.alignment = self.alignment_center
                 cell.border = self.border_thin
+                row_cells[start_col - 1] = cell
 
                 # Merge cells ถ้ามีมากกว่า 1 คอลัมน์
                 if end_col > start_col:
                     start_letter = get_column_letter(start_col)
                     end_letter = get_column_letter(end_col)
-                    ws.merge_cells(f'{start_letter}8:{end_letter}8')
+                    ws.merged_cells.add(f'{start_letter}8:{end_letter}8')
 
-                    # ใส่ border และสีให้กับเซลล์ที่ merge ด้วย
-                    for col in range(start_col, end_col + 1):
-                        ws.cell(row=8, column=col).border = self.border_thin
-                        ws.cell(row=8, column=col).fill = sub_fill
+                    # เซลล์ที่ถูก merge ใส่แค่ border (Excel วาดกรอบของช่วง merge จาก border ของทุกเซลล์
+                    # แต่สีพื้นใช้จากเซลล์แรกเท่านั้น จึงไม่ต้องใส่ fill ซ้ำ)
+                    for col in range(start_col + 1, end_col + 1):
+                        merged_cell = WriteOnlyCell(ws)
+                        merged_cell.border = self.border_thin
+                        row_cells[col - 1] = merged_cell
+        ws.append(row_cells)
 
         # บรรทัดที่ 9: Product Code Headers (ถ้ามี)
         # บรรทัดที่ 10: Product Name Headers (ถ้ามี)
-        has_product_headers = sheet_data.get('has_product_headers', False)
         if has_product_headers:
-            # Row 9: Product Code
-            product_code_headers = sheet_data.get('product_code_headers', [])
-            if product_code_headers:
-                for col_idx, header in enumerate(product_code_headers, start=2):
-                    cell = ws.cell(row=9, column=col_idx, value=header if pd.notna(header) and str(header).strip() != '' else '')
-                    cell.font = Font(name='TH Sarabun New', size=14, bold=True)
-                    cell.alignment = self.alignment_center
-                    cell.border = self.border_thin
-                    # ใส่สีตาม BU (ทุกคอลัมน์ รวม Total และ cells ว่าง)
-                    if col_idx in bu_color_map:
-                        bu_color = bu_color_map[col_idx]
-                        cell.fill = PatternFill(start_color=bu_color, end_color=bu_color, fill_type='solid')
-
-            # Row 10: Product Name
-            product_name_headers = sheet_data.get('product_name_headers', [])
-            if product_name_headers:
-                for col_idx, header in enumerate(product_name_headers, start=2):
-                    cell = ws.cell(row=10, column=col_idx, value=header if pd.notna(header) and str(header).strip() != '' else '')
-                    cell.font = Font(name='TH Sarabun New', size=14, bold=True)
+            for key in ('product_code_headers', 'product_name_headers'):
+                row_cells = [None]
+                for col_idx, header in enumerate(sheet_data.get(key, []), start=2):
+                    cell = WriteOnlyCell(ws, value=header if header.strip() != '' else '')
+                    cell.font = self.font_subheader
                     cell.alignment = self.alignment_center
                     cell.border = self.border_thin
                     # ใส่สีตาม BU (ทุกคอลัมน์ รวม Total และ cells ว่าง)
                     if col_idx in bu_color_map:
-                        bu_color = bu_color_map[col_idx]
-                        cell.fill = PatternFill(start_color=bu_color, end_color=bu_color, fill_type='solid')
-
-        # กำหนด start_row ตามประเภท sheet
-        if has_product_headers:
-            start_row = 11  # ถ้ามี Product headers ให้เริ่มที่แถว 11
+                        cell.fill = self._get_fill(bu_color_map[col_idx])
+                    row_cells.append(cell)
+                ws.append(row_cells)
         else:
-            start_row = 10  # ถ้าไม่มีให้เริ่มที่แถว 10
+            # บรรทัดที่ 9: ว่าง
+            ws.append([])
 
         # Data
         data_df = sheet_data['data_df']  # ข้อมูลที่เริ่มจาก row 7 ของ CSV
 
-        for row_idx, row_data in data_df.iterrows():
+        # ตรวจสอบประเภทของแถวจาก column แรกทีเดียวทั้งคอลัมน์ (ไม่ต้องเช็ค string ทีละแถวในลูป)
+        if len(data_df.columns) > 0:
+            first_col = data_df.iloc[:, 0]
+        else:
+            first_col = pd.Series('', index=data_df.index, dtype=object)
+        first_col_str = first_col.astype(str).str.strip()
+        # แถวหลัก (01., 02., etc.)
+        is_main_arr = (first_col_str.str[:2].str.isdigit() & (first_col_str.str[2:3] == '.')).to_numpy(dtype=bool)
+        # แถวที่ขึ้นต้นด้วย # (ไม่ต้องระบายสี)
+        is_hash_arr = first_col_str.str.startswith('#').to_numpy(dtype=bool)
+
+        # Merge cells แนวตั้งสำหรับ column B (รายละเอียด) - merge cells ที่มีค่าเหมือนกันติดกัน
+        # แต่ข้ามกรณีที่เป็น header ที่ขึ้นต้นด้วย # หรือ 01., 02., etc.
+        # write-only อ่านค่าย้อนกลับจาก sheet ไม่ได้ จึงคำนวณจาก data_df ก่อนเขียน
+        merge_ranges = self._merge_description_column(ws, start_row, first_col, is_main_arr | is_hash_arr)
+        # เซลล์ที่ถูก merge (ไม่ใช่เซลล์แรก) ไม่ต้องมีค่า
+        merged_rows = {row for start_r, end_r in merge_ranges for row in range(start_r + 1, end_r + 1)}
+
+        # เตรียม Style ของเซลล์ตัวเลขแต่ละแบบไว้ครั้งเดียว แล้วก๊อปปี้ทั้งชุดลงแต่ละเซลล์
+        # (ไม่ต้องตั้ง font/alignment/border/fill/number_format ทีละ attribute ทุกเซลล์)
+        # key = (ชนิดค่า, เป็นแถวหลักที่ต้องระบายสีหรือไม่)
+        data_styles = {}
+        for is_filled in (False, True):
+            fill = self.fill_main_row if is_filled else None
+            data_styles['positive', is_filled] = self._prepare_style(
+                ws, self.font_data, self.alignment_right, fill, ACCOUNTING_NUMBER_FORMAT)
+            data_styles['negative', is_filled] = self._prepare_style(
+                ws, self.font_data_negative, self.alignment_right, fill, ACCOUNTING_NUMBER_FORMAT)
+            data_styles['blank', is_filled] = self._prepare_style(ws, self.font_data, self.alignment_right, fill)
+            data_styles['text', is_filled] = self._prepare_style(ws, self.font_data, self.alignment_center, fill)
+
+        # Style ของ column B (รายละเอียด): แถว # ตัวหนาไม่ระบายสี, รายการหลักสีส้มอ่อน, รายการอื่นสีชมพูอ่อน
+        description_styles = {
+            'hash': self._prepare_style(ws, self.font_data_bold, self.alignment_vcenter),
+            'main': self._prepare_style(ws, self.font_data, self.alignment_vcenter, self.fill_main_row),
+            'other': self._prepare_style(ws, self.font_data, self.alignment_vcenter, self.fill_description),
+        }
+
+        for row_idx, row in enumerate(data_df.itertuples(index=False, name=None)):
             excel_row = start_row + row_idx
+            if len(row) == 0:
+                ws.append([])
+                continue
+
+            first_col_value = row[0]
+            is_main_row = is_main_arr[row_idx]
+            is_hash_row = is_hash_arr[row_idx]
+
+            # ใส่สีพื้นหลังสำหรับรายการหลัก (ยกเว้นแถวที่ขึ้นต้นด้วย #)
+            fill_row = is_main_row and not is_hash_row
+
+            # Column B = รายละเอียด
+            cell = WriteOnlyCell(ws, value=None if excel_row in merged_rows else first_col_value)
+            # ใส่สีพื้นหลัง (ยกเว้นแถวที่ขึ้นต้นด้วย #)
+            if is_hash_row:
+                cell._style = copy(description_styles['hash'])
+            elif is_main_row:
+                cell._style = copy(description_styles['main'])  # สีส้มอ่อนสำหรับรายการหลัก
+            else:
+                cell._style = copy(description_styles['other'])  # สีชมพูอ่อนสำหรับรายการอื่น
+            row_cells = [None, cell]
+
+            # Column C เป็นต้นไป = ตัวเลข
+            for value in row[1:]:
+                # ค่าที่แปลงเป็นตัวเลขไม่ได้ยังคงเป็น string อยู่ จึงต้องเช็คชนิดทีละค่า
+                if isinstance(value, (int, float)):
+                    if abs(value) < 0.01:
+                        # ถ้าค่าเป็น 0 หรือใกล้ 0 ให้แสดงเป็นช่องว่าง
+                        # (ไม่ใส่ค่าเลย แทนการเขียน string ว่างลงไฟล์ แต่ยังคง border/สีพื้นไว้ให้ตารางต่อเนื่อง)
+                        kind = 'blank'
+                        value = None
+                    elif value < 0:
+                        kind = 'negative'
+                    else:
+                        kind = 'positive'
+                else:
+                    kind = 'text'
 
-            # ตรวจสอบประเภทของแถว
-            first_col_value = row_data.iloc[0] if len(row_data) > 0 else ''
-            first_col_str = str(first_col_value).strip() if pd.notna(first_col_value) else ''
+                cell = WriteOnlyCell(ws, value=value)
+                cell._style = copy(data_styles[kind, fill_row])
+                row_cells.append(cell)
+            ws.append(row_cells)
 
-            # แถวหลัก (01., 02., etc.)
-            is_main_row = (len(first_col_str) >= 3 and
-                          first_col_str[:2].isdigit() and
-                          first_col_str[2] == '.')
+    def _prepare_style(self, ws, font, alignment, fill=None, number_format=None):
+        """เตรียม Style ของเซลล์ข้อมูล (มีกรอบบางรอบด้าน) ไว้ครั้งเดียว
 
-            # แถวที่ขึ้นต้นด้วย # (ไม่ต้องระบายสี)
-            is_hash_row = first_col_str.startswith('#')
+        Returns:
+            StyleArray สำหรับก๊อปปี้ลงเซลล์ด้วย cell._style = copy(style)
+        """
+        cell = WriteOnlyCell(ws)
+        cell.font = font
+        cell.alignment = alignment
+        cell.border = self.border_thin
+        if fill is not None:
+            cell.fill = fill
+        if number_format is not None:
+            cell.number_format = number_format
+        return cell._style
 
-            for col_idx, value in enumerate(row_data, start=2):
-                cell = ws.cell(row=excel_row, column=col_idx, value=value)
+    def _compute_merge_ranges(self, headers, start=2):
+        """หาช่วงคอลัมน์ที่ต้อง merge ของแถว header (BU / Sub header)
 
-                # จัดรูปแบบตามประเภทข้อมูล
-                if col_idx == 2:  # Column B = รายละเอียด
-                    cell.font = Font(name='TH Sarabun New', size=16, bold=True if is_hash_row else False)
-                    cell.alignment = self.alignment_vcenter
-                    cell.border = self.border_thin
-                    # ใส่สีพื้นหลัง (ยกเว้นแถวที่ขึ้นต้นด้วย #)
-                    if not is_hash_row:
-                        if is_main_row:
-                            cell.fill = self.fill_main_row  # สีส้มอ่อนสำหรับรายการหลัก
-                        else:
-                            cell.fill = self.fill_description  # สีชมพูอ่อนสำหรับรายการอื่น
-                else:
-                    # ตัวเลข
-                    if isinstance(value, (int, float)):
-                        cell.font = Font(name='TH Sarabun New', size=16)
-                        cell.alignment = self.alignment_right
+        header ที่ไม่ว่างเริ่มช่วงใหม่ คอลัมน์ว่างที่ตามมาถือว่าอยู่ในช่วงเดียวกัน
 
-                        # ถ้าค่าเป็น 0 หรือใกล้ 0 ให้แสดงเป็นช่องว่าง
-                        if abs(value) < 0.01:
-                            cell.value = ''
-                        else:
-                            # ใช้รูปแบบบัญชี: เลขลบแสดงเป็น (xxx.xx) สีแดง
-                            if value < 0:
-                                cell.number_format = '#,##0.00_);[Red](#,##0.00)'
-                                cell.font = Font(name='TH Sarabun New', size=16, color='FF0000')
-                            else:
-                                cell.number_format = '#,##0.00_);[Red](#,##0.00)'
-
-                        cell.border = self.border_thin
-                        # ใส่สีพื้นหลังสำหรับรายการหลัก (ยกเว้นแถวที่ขึ้นต้นด้วย #)
-                        if is_main_row and not is_hash_row:
-                            cell.fill = self.fill_main_row
-                    else:
-                        cell.font = Font(name='TH Sarabun New', size=16)
-                        cell.alignment = self.alignment_center
-                        cell.border = self.border_thin
-                        # ใส่สีพื้นหลังสำหรับรายการหลัก (ยกเว้นแถวที่ขึ้นต้นด้วย #)
-                        if is_main_row and not is_hash_row:
-                            cell.fill = self.fill_main_row
+        Args:
+            headers: ค่า header ของแต่ละคอลัมน์ (เรียงตามคอลัมน์)
+            start: เลขคอลัมน์ของ header ตัวแรก
 
-        # Merge cells แนวตั้งสำหรับ column B (รายละเอียด) - merge cells ที่มีค่าเหมือนกันติดกัน
-        # แต่ข้ามกรณีที่เป็น header ที่ขึ้นต้นด้วย # หรือ 01., 02., etc.
-        self._merge_description_column(ws, start_row, len(data_df))
+        Returns:
+            list ของ (คอลัมน์เริ่ม, คอลัมน์สุดท้าย, ชื่อ header)
+        """
+        merge_ranges = []
+        current_name = None
+        start_col = None
 
-        # ปรับความกว้างของคอลัมน์
-        ws.column_dimensions['B'].width = 65
-        for col_idx in range(3, 50):  # Columns C onwards
-            col_letter = get_column_letter(col_idx)
-            ws.column_dimensions[col_letter].width = 15
+        for col_idx, header in enumerate(headers, start=start):
+            # เช็ค NaN ด้วย header != header แทน pd.notna (ไม่ต้องผ่าน NumPy ทุกคอลัมน์)
+            if header is None or (isinstance(header, float) and header != header):
+                header_str = ''
+            else:
+                header_str = str(header).strip()
 
-        # ปรับความสูงของแถว
-        ws.row_dimensions[2].height = 21.65
-        ws.row_dimensions[3].height = 21.65
-        ws.row_dimensions[4].height = 21.65
-        ws.row_dimensions[6].height = 14.15
-        ws.row_dimensions[9].height = 54.0
+            # ถ้าเจอ header ใหม่ที่ไม่ว่าง
+            if header_str != '' and header_str != 'nan':
+                # ถ้ามี header ก่อนหน้า ให้บันทึก merge range
+                if current_name is not None:
+                    merge_ranges.append((start_col, col_idx - 1, current_name))
+
+                # เริ่มช่วงใหม่
+                current_name = header_str
+                start_col = col_idx
+
+        # บันทึกช่วงสุดท้าย
+        if current_name is not None:
+            merge_ranges.append((start_col, len(headers) + start - 1, current_name))
+
+        return merge_ranges
 
     def _get_bu_color(self, bu_name):
         """หาสีสำหรับ BU จากชื่อ
@@ -470,75 +525,74 @@ class CSVToExcelConverter:
         Returns:
             สี HEX code
         """
-        # ตรวจสอบว่า bu_name มีคำสำคัญที่ตรงกับ key ใน bu_colors หรือไม่
-        for bu_key, color in self.bu_colors.items():
-            if bu_key in bu_name:
-                return color
+        color = self.bu_color_cache.get(bu_name)
+        if color is not None:
+            return color
 
+        # ตรวจสอบว่า bu_name มีคำสำคัญที่ตรงกับ key ใน bu_colors หรือไม่ (key แรกที่เจอตามลำดับ)
         # ถ้าไม่เจอ ให้ใช้สีเริ่มต้น
-        return 'FFF4DEDC'
+        color = next((color for bu_key, color in self._bu_match if bu_key in bu_name), 'FFF4DEDC')
+        self.bu_color_cache[bu_name] = color
+        return color
 
-    def _merge_description_column(self, ws, start_row, num_rows):
-        """Merge cells แนวตั้งใน column B สำหรับค่าที่เหมือนกันติดกัน
+    def _get_fill(self, color):
+        """คืน PatternFill สีทึบของสี ARGB (สร้างครั้งเดียวแล้วเก็บไว้ใน self.bu_fills)
 
-        Args:
-            ws: worksheet
-            start_row: แถวเริ่มต้นของข้อมูล
-            num_rows: จำนวนแถวข้อมูล
-        """
-        if num_rows == 0:
-            return
+        openpyxl ต้องการสีแบบ ARGB 8 หลัก (เช่น 'FFF4DEDC') ถ้าส่งมาแค่ 6 หลัก
+        จะได้ alpha เป็น 00 และบางโปรแกรมจะแสดงสีเป็นโปร่งใส
 
-        merge_ranges = []
-        current_value = None
-        merge_start = None
+        Args:
+            color: สี ARGB 8 หลัก
 
-        for row_idx in range(num_rows):
-            excel_row = start_row + row_idx
-            cell_value = ws.cell(row=excel_row, column=2).value  # Column B
-
-            # แปลงค่าเป็น string และตัดช่องว่าง
-            value_str = str(cell_value).strip() if cell_value is not None else ''
-
-            # ไม่ merge กรณีที่เป็น:
-            # 1. Header ที่ขึ้นต้นด้วยตัวเลข (01., 02., etc.)
-            # 2. Header ที่ขึ้นต้นด้วย #
-            # 3. ค่าว่าง
-            is_header = (value_str.startswith('#') or
-                        (len(value_str) >= 3 and value_str[:2].isdigit() and value_str[2] == '.'))
-
-            if is_header or value_str == '':
-                # บันทึก merge range ก่อนหน้า (ถ้ามี)
-                if merge_start is not None and excel_row > merge_start + 1:
-                    merge_ranges.append((merge_start, excel_row - 1))
-
-                # Reset
-                current_value = None
-                merge_start = None
-            else:
-                # ถ้าค่าเหมือนกับค่าก่อนหน้า
-                if value_str == current_value:
-                    # ยังอยู่ในช่วงเดียวกัน
-                    pass
-                else:
-                    # บันทึก merge range ก่อนหน้า (ถ้ามี)
-                    if merge_start is not None and excel_row > merge_start + 1:
-                        merge_ranges.append((merge_start, excel_row - 1))
+        Returns:
+            PatternFill
+        """
+        fill = self.bu_fills.get(color)
+        if fill is None:
+            if len(color) != 8:
+                raise ValueError(f"สีต้องเป็น ARGB 8 หลัก (เช่น 'FFF4DEDC'): {color!r}")
+            fill = PatternFill(start_color=color, end_color=color, fill_type='solid')
+            self.bu_fills[color] = fill
+        return fill
+
+    def _merge_description_column(self, ws, start_row, first_col_series, is_header_mask):
+        """Merge cells แนวตั้งใน column B สำหรับค่าที่เหมือนกันติดกัน
 
-                    # เริ่มช่วงใหม่
-                    current_value = value_str
-                    merge_start = excel_row
+        หาช่วงของค่าที่ซ้ำกันติดกันจากทั้งคอลัมน์ทีเดียว (run-length) ไม่ต้องไล่ทีละแถว
 
-        # บันทึก merge range สุดท้าย
-        if merge_start is not None and start_row + num_rows > merge_start + 1:
-            merge_ranges.append((merge_start, start_row + num_rows - 1))
+        Args:
+            ws: worksheet
+            start_row: แถวเริ่มต้นของข้อมูล
+            first_col_series: ค่าใน column B ของแต่ละแถวข้อมูล (เรียงตามแถว)
+            is_header_mask: array บอกว่าแถวไหนเป็น header (ขึ้นต้นด้วย 01., 02., ... หรือ #)
 
-        # ทำการ merge cells
+        Returns:
+            list ของ (แถวเริ่ม, แถวสุดท้าย) ที่ merge
+        """
+        if len(first_col_series) == 0:
+            return []
+
+        # แปลงค่าเป็น string และตัดช่องว่าง (อ่าน CSV แบบไม่มี NA filter ช่องว่างจึงเป็น '' และไม่ถูก merge)
+        text = first_col_series.astype(str).str.strip().reset_index(drop=True)
+
+        # ไม่ merge กรณีที่เป็น:
+        # 1. Header ที่ขึ้นต้นด้วยตัวเลข (01., 02., etc.)
+        # 2. Header ที่ขึ้นต้นด้วย #
+        # 3. ค่าว่าง
+        mergeable = ~(np.asarray(is_header_mask, dtype=bool) | (text == '').to_numpy())
+
+        # แถวที่ค่าต่างจากแถวก่อนหน้าคือจุดเริ่มช่วงใหม่ (แถว header/ค่าว่างมีค่าต่างจากแถวข้างเคียงที่ merge ได้อยู่แล้ว)
+        run_id = (text != text.shift()).cumsum()
+        positions = pd.Series(np.arange(len(text)))[mergeable]
+        runs = positions.groupby(run_id[mergeable]).agg(['first', 'last'])
+
+        # ทำการ merge cells เฉพาะช่วงที่มีอย่างน้อย 2 แถว (เซลล์แรกของแต่ละช่วงใช้ alignment_vcenter อยู่แล้ว)
+        runs = runs[runs['last'] > runs['first']]
+        merge_ranges = [(start_row + first, start_row + last) for first, last in zip(runs['first'], runs['last'])]
         for start_r, end_r in merge_ranges:
-            if end_r > start_r:  # มีอย่างน้อย 2 แถว
-                ws.merge_cells(f'B{start_r}:B{end_r}')
-                # ตั้งค่า alignment ให้ center vertically
-                ws.cell(row=start_r, column=2).alignment = self.alignment_vcenter
+            ws.merged_cells.add(f'B{start_r}:B{end_r}')
+
+        return merge_ranges
 
     def convert(self, period, output_filename=None):
         """แปลงไฟล์ CSV เป็น Excel
@@ -558,24 +612,30 @@ class CSVToExcelConverter:
         for sheet_name, csv_path in csv_files.items():
             print(f"  - {os.path.basename(csv_path)} → {sheet_name}")
 
-        # สร้าง workbook ใหม่
-        wb = openpyxl.Workbook()
-        wb.remove(wb.active)  # ลบ sheet default
+        # สร้าง workbook ใหม่แบบ write-only (เขียนแถวลงไฟล์ทีละแถว ไม่เก็บทั้ง sheet ไว้ในหน่วยความจำ)
+        wb = openpyxl.Workbook(write_only=True)
 
-        # สร้าง sheet แต่ละอัน
-        for sheet_name, csv_path in csv_files.items():
-            print(f"\n⏳ กำลังประมวลผล: {sheet_name}...")
+        # อ่าน CSV ทุกไฟล์พร้อมกันใน process แยก (แต่ละไฟล์ไม่ขึ้นต่อกัน)
+        # ส่วนการเขียน sheet ต้องทำใน process หลักตามลำดับ เพราะ write-only workbook เขียนลงไฟล์เดียว
+        max_workers = min(len(csv_files), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = {sheet_name: executor.submit(self.read_csv_data, csv_path)
+                       for sheet_name, csv_path in csv_files.items()}
+
+            # สร้าง sheet แต่ละอัน
+            for sheet_name in csv_files:
+                print(f"\n⏳ กำลังประมวลผล: {sheet_name}...")
 
-            # อ่านข้อมูลจาก CSV
-            sheet_data = self.read_csv_data(csv_path)
+                # อ่านข้อมูลจาก CSV (รอผลจาก process ที่อ่านไฟล์นี้)
+                sheet_data = futures[sheet_name].result()
 
-            # สร้าง sheet
-            ws = wb.create_sheet(title=sheet_name)
+                # สร้าง sheet
+                ws = wb.create_sheet(title=sheet_name)
 
-            # จัดรูปแบบ
-            self.create_formatted_sheet(ws, sheet_data, period)
+                # จัดรูปแบบ
+                self.create_formatted_sheet(ws, sheet_data, period)
 
-            print(f"  ✓ สำเร็จ")
+                print(f"  ✓ สำเร็จ")
 
         # สร้างชื่อไฟล์ output
         if not output_filename:
@@ -606,7 +666,7 @@ def main():
         for filename in os.listdir('.'):
             if filename.endswith('.csv') and ('ต้นทุน' in filename or 'บัญชี' in filename):
                 # Extract period from filename (e.g., "1025" from "001_ต้นทุน_BU_1025 - 10-11-68.csv")
-                match = re.search(r'_(\d{4})\s*-', filename)
+                match = PERIOD_PATTERN.search(filename)
                 if match:
                     period = match.group(1)
                     print(f"🔍 ตรวจพบงวด: {period} จากไฟล์ {filename}")